@@ -9,6 +9,15 @@ import jwt
 from datetime import datetime, timezone, timedelta
 from functools import wraps # 用于创建装饰器
 import decimal # 导入 decimal 模块
+import math
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from search_index import SearchIndex, ChangeLog, DOC_TYPES
+from response_cache import ResponseCache
+from circuit_breaker import CircuitBreaker, CLOSED
+import idempotency
+from idempotency import IdempotencyStore, StoredResponse
 
 # 加载 .env 文件中的环境变量
 load_dotenv()
@@ -20,20 +29,351 @@ app.config['DEBUG'] = os.getenv('FLASK_DEBUG', '0') == '1'
 CORS(app)
 
 # --- 数据库连接 ---
-def get_db_connection():
-    """建立并返回一个 MySQL 数据库连接"""
+# 每个进程自己的空闲连接栈。取用和归还只是 deque 的 pop/append (本身线程安全)，不加锁；
+# 新连接在请求线程中直接建立，并发建连互不阻塞。归还时不重置会话。
+# 驱动的 cursor() 每次都会 ping 一次服务器，这就是取用时的存活检查，连接池不再另外 ping：
+# 复用的空闲连接在 cursor() 时发现已失效 (例如数据库重启) 则换一个新连接重试一次。
+_idle_connections = deque()
+_idle_connections_pid = None
+_db_pool_size = int(os.getenv('DB_POOL_SIZE', 8))
+# 数据库熔断器：连接失败或语句执行中连接级错误 (含读超时) 的比例过高时直接返回 503，不再等待超时
+db_breaker = CircuitBreaker(
+    failure_rate_threshold=float(os.getenv('DB_BREAKER_FAILURE_RATE', 0.5)),
+    window_size=int(os.getenv('DB_BREAKER_WINDOW', 20)),
+    min_calls=int(os.getenv('DB_BREAKER_MIN_CALLS', 5)),
+    open_seconds=float(os.getenv('DB_BREAKER_OPEN_SECONDS', 5)),
+    max_open_seconds=float(os.getenv('DB_BREAKER_MAX_OPEN_SECONDS', 60)),
+    # 探测请求最长耗时约为连接超时 + 读超时，超过仍无结果即视为结果丢失
+    probe_timeout=float(os.getenv('DB_BREAKER_PROBE_TIMEOUT', 30))
+)
+
+def _db_config():
+    return dict(
+        host=os.getenv('DB_HOST'),
+        port=int(os.getenv('DB_PORT', 3306)),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD'),
+        database=os.getenv('DB_NAME'),
+        auth_plugin='mysql_native_password',
+        # 写路径不依赖多语句事务：选课、退选、审批均为单条条件语句，注册和上传的先查后插
+        # 在并发重复时由主键约束拒绝插入。开启自动提交，省去单独的 COMMIT 往返
+        autocommit=True,
+        # 数据库无响应时尽快失败，而不是等待驱动默认的超时时间
+        connection_timeout=int(os.getenv('DB_CONNECT_TIMEOUT', 3)),
+        read_timeout=int(os.getenv('DB_READ_TIMEOUT', 10))
+    )
+
+class PooledConnection:
+    """MySQL 连接的包装：close() 时放回本进程的空闲栈，而不是断开。
+    执行语句时出现连接级错误的连接被标记为损坏并计入熔断器失败，close() 时直接断开丢弃；
+    未出错的连接在 close() 时计为一次成功，因此路由的 finally 中应无条件调用 close()。"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._closed = False
+        self.broken = False
+        # 是否取自空闲栈 (可能已在空闲期间失效)
+        self.reused = False
+
+    def cursor(self, *args, **kwargs):
+        try:
+            return PooledCursor(self, self._conn.cursor(*args, **kwargs))
+        except (mysql.connector.OperationalError, mysql.connector.InterfaceError):
+            if not self.reused:
+                self.connection_failed()
+                raise
+        # 空闲连接已失效：丢弃它和其他空闲连接，换一个新连接重试一次
+        self.reused = False
+        self.disconnect()
+        close_db_pool()
+        try:
+            self._conn = mysql.connector.connect(**_db_config())
+            return PooledCursor(self, self._conn.cursor(*args, **kwargs))
+        except mysql.connector.Error:
+            self.connection_failed()
+            raise
+
+    def connection_failed(self):
+        """连接已不可用 (断开或读超时)：标记为损坏、计入熔断器失败，
+        并丢弃其他空闲连接 (数据库重启后它们通常也已失效)"""
+        if self.broken: return
+        self.broken = True
+        db_breaker.record_failure()
+        self.disconnect()
+        close_db_pool()
+
+    def rollback(self):
+        # 损坏的连接上回滚只会再抛一次异常；开启自动提交时本来也没有未提交的事务
+        if not self.broken:
+            self._conn.rollback()
+
+    def close(self):
+        if self._closed: return
+        self._closed = True
+        if not self.broken:
+            db_breaker.record_success()
+        if (self.broken or self._conn.unread_result or _idle_connections_pid != os.getpid()
+                or len(_idle_connections) >= _db_pool_size):
+            self.disconnect()
+            return
+        _idle_connections.append(self)
+
+    def disconnect(self):
+        try:
+            self._conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class PooledCursor:
+    """游标包装：语句或取结果时出现连接级错误 (OperationalError/InterfaceError) 即标记所属连接损坏"""
+
+    def __init__(self, conn, cursor):
+        self._pooled_conn = conn
+        self._cursor = cursor
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except (mysql.connector.OperationalError, mysql.connector.InterfaceError):
+            self._pooled_conn.connection_failed()
+            raise
+
+    def execute(self, *args, **kwargs):
+        return self._call(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._call(self._cursor.executemany, *args, **kwargs)
+
+    def fetchone(self):
+        return self._call(self._cursor.fetchone)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._call(self._cursor.fetchmany, *args, **kwargs)
+
+    def fetchall(self):
+        return self._call(self._cursor.fetchall)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def init_db_pool():
+    """为当前进程准备一个空的空闲连接栈 (不预先建立连接)。连接不能跨 fork 共享，
+    继承自父进程的空闲连接直接丢弃而不断开 (断开会影响父进程仍在使用的 socket)。"""
+    global _idle_connections, _idle_connections_pid, _db_pool_size
+    _idle_connections, _idle_connections_pid = deque(), os.getpid()
+    _db_pool_size = int(os.getenv('DB_POOL_SIZE', 8))
+
+def close_db_pool():
+    """断开当前进程的所有空闲连接。预加载进程在 fork 之前调用，避免 worker 继承已打开的连接；
+    worker 退出时调用以便干净地断开数据库连接。"""
+    if _idle_connections_pid != os.getpid(): return
+    while True:
+        try:
+            _idle_connections.pop().disconnect()
+        except IndexError:
+            return
+
+def _checkout_idle_connection():
+    """取出一个空闲连接，没有时返回 None (不检查存活，见 PooledConnection.cursor)"""
     try:
-        conn = mysql.connector.connect(
-            host=os.getenv('DB_HOST'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            database=os.getenv('DB_NAME'),
-            auth_plugin='mysql_native_password'
-        )
-        return conn
-    except mysql.connector.Error as err:
-        print(f"数据库连接错误: {err}")
+        conn = _idle_connections.pop()
+    except IndexError:
         return None
+    conn._closed = False
+    conn.reused = True
+    return conn
+
+def get_db_connection():
+    """取得一个 MySQL 数据库连接 (close() 即放回空闲栈)，优先复用本进程的空闲连接。
+    熔断器打开时不尝试连接，直接返回 None。建连失败立即计入熔断器，
+    请求的成败在连接 close() 或出现连接级错误时计入。"""
+    if not db_breaker.allow(): return None
+    if _idle_connections_pid != os.getpid():
+        init_db_pool()
+    conn = _checkout_idle_connection()
+    if conn is None:
+        try:
+            conn = PooledConnection(mysql.connector.connect(**_db_config()))
+        except mysql.connector.Error as err:
+            db_breaker.record_failure()
+            # 数据库连不上时空闲连接多半也已失效
+            close_db_pool()
+            print(f"数据库连接错误: {err}")
+            return None
+    return conn
+
+# --- 全文检索索引 ---
+search_index = SearchIndex()
+_search_index_lock = threading.Lock()
+# 跨进程共享的索引变更日志：某个 worker 增量更新索引后追加一条记录，其他 worker 检索前按记录增量应用
+_search_changes = ChangeLog()
+_search_generation_lock = threading.Lock()
+# 已上传但尚未审批的课程，批准时直接加入索引，避免再次查询数据库 (按上传顺序淘汰最早的)
+_pending_search_courses = OrderedDict()
+_pending_search_courses_lock = threading.Lock()
+_PENDING_SEARCH_COURSES_MAX = 1000
+# 已批准但本进程尚未取得内容的文档，在下一次检索前批量查询并加入索引，避免审批请求额外查询数据库
+_search_backlog = {'course': set(), 'message': set()}
+
+def _index_course(course):
+    """将一门已批准课程 (字典行) 加入检索索引"""
+    if isinstance(course.get('credits'), decimal.Decimal):
+        course['credits'] = float(course['credits'])
+    payload = {k: course.get(k) for k in ('course_id', 'course_name', 'hours', 'credits', 'teacher_name')}
+    search_index.add('course', course['course_id'], {
+        'course_id': course['course_id'],
+        'course_name': course.get('course_name'),
+        'teacher_name': course.get('teacher_name'),
+    }, payload)
+
+def _index_message(msg):
+    """将一条已批准留言 (字典行) 加入检索索引"""
+    if isinstance(msg.get('post_date'), datetime):
+        msg['post_date'] = msg['post_date'].strftime('%Y-%m-%d %H:%M:%S')
+    payload = {k: msg.get(k) for k in ('message_id', 'content', 'post_date')}
+    search_index.add('message', msg['message_id'], {'content': msg.get('content')}, payload)
+
+def _remember_pending_course(course):
+    """记录刚上传的课程，超出上限时丢弃最早的 (丢弃的课程批准时改为从数据库取回)"""
+    with _pending_search_courses_lock:
+        _pending_search_courses[course['course_id']] = course
+        while len(_pending_search_courses) > _PENDING_SEARCH_COURSES_MAX:
+            _pending_search_courses.popitem(last=False)
+
+def _take_pending_course(course_id):
+    with _pending_search_courses_lock:
+        return _pending_search_courses.pop(course_id, None)
+
+def _search_index_changed(op, doc_type, doc_id):
+    """本进程增量更新索引后调用，把变更记入共享日志供其他 worker 应用；
+    本进程此前已是最新时直接前移版本号，不必再应用自己的变更 (重复应用也无害)"""
+    with _search_generation_lock:
+        generation = _search_changes.append(op, doc_type, doc_id)
+        if search_index.generation == generation - 1:
+            search_index.generation = generation
+
+def _queue_search_doc(doc_type, doc_id):
+    """登记一篇新批准的文档，下一次检索前再取回内容加入索引"""
+    with _search_index_lock:
+        _search_backlog[doc_type].add(doc_id)
+    _search_index_changed(ChangeLog.ADD, doc_type, doc_id)
+
+def _apply_search_changes_locked():
+    """按共享日志应用其他 worker 的变更 (新增的文档转入待办，下一次检索前批量取回)；
+    索引尚未构建或落后过多无法增量更新时返回 False。调用方须持有 _search_index_lock"""
+    if not search_index.ready: return False
+    current, changes = _search_changes.since(search_index.generation)
+    if changes is None: return False
+    for op, doc_type, doc_id in changes:
+        if doc_type == 'message': doc_id = int(doc_id)
+        if op == ChangeLog.ADD:
+            _search_backlog[doc_type].add(doc_id)
+        else:
+            _search_backlog[doc_type].discard(doc_id)
+            search_index.remove(doc_type, doc_id)
+    with _search_generation_lock:
+        search_index.generation = max(search_index.generation, current)
+    return True
+
+def _sync_search_index():
+    """检索前调用：增量应用其他 worker 的变更，无法增量更新时全量重建；索引不可用时返回 False"""
+    with _search_index_lock:
+        if _apply_search_changes_locked(): return True
+    return build_search_index(force=False)
+
+def _flush_search_backlog():
+    """批量取回待加入索引的文档 (每种类型一条查询)；失败时保留待办项，返回是否成功"""
+    with _search_index_lock:
+        pending = {doc_type: list(ids) for doc_type, ids in _search_backlog.items() if ids}
+        if not pending: return True
+        conn = get_db_connection()
+        if not conn: return False
+        cursor = conn.cursor(dictionary=True)
+        try:
+            if 'course' in pending:
+                placeholders = ', '.join(['%s'] * len(pending['course']))
+                cursor.execute(f"""
+                    SELECT c.course_id, c.course_name, c.hours, c.credits, t.name AS teacher_name
+                    FROM courses c
+                    JOIN teachers t ON c.teacher_id = t.teacher_id
+                    WHERE c.approval_status = 'approved' AND c.course_id IN ({placeholders})
+                """, pending['course'])
+                for course in cursor.fetchall(): _index_course(course)
+            if 'message' in pending:
+                placeholders = ', '.join(['%s'] * len(pending['message']))
+                cursor.execute(f"SELECT message_id, content, post_date FROM messages WHERE approval_status = 'approved' AND message_id IN ({placeholders})", pending['message'])
+                for msg in cursor.fetchall(): _index_message(msg)
+            for doc_type, ids in pending.items(): _search_backlog[doc_type].difference_update(ids)
+            return True
+        except mysql.connector.Error as err:
+            print(f"更新检索索引数据库操作失败: {err}"); return False
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+def build_search_index(force=True):
+    """从数据库全量构建检索索引 (已批准课程 + 已批准留言)，成功返回 True"""
+    with _search_index_lock:
+        if not force and _apply_search_changes_locked(): return True
+        conn = get_db_connection()
+        if not conn: return False
+        cursor = conn.cursor(dictionary=True)
+        try:
+            generation = _search_changes.generation
+            search_index.clear()
+            cursor.execute("""
+                SELECT c.course_id, c.course_name, c.hours, c.credits, t.name AS teacher_name
+                FROM courses c
+                JOIN teachers t ON c.teacher_id = t.teacher_id
+                WHERE c.approval_status = 'approved'
+            """)
+            for course in cursor.fetchall(): _index_course(course)
+            cursor.execute("SELECT message_id, content, post_date FROM messages WHERE approval_status = 'approved'")
+            for msg in cursor.fetchall(): _index_message(msg)
+            for ids in _search_backlog.values(): ids.clear()
+            search_index.ready = True
+            search_index.generation = generation
+            print(f"检索索引构建完成: {search_index.stats()}")
+            return True
+        except mysql.connector.Error as err:
+            print(f"构建检索索引数据库操作失败: {err}"); return False
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+# --- 按用户缓存的响应 ---
+response_cache = ResponseCache(max_bytes=int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024)))
+
+# --- 幂等键存储 (吸收客户端重试和重复提交)，位于共享内存中，fork 之后各 worker 共用 ---
+idempotency_store = IdempotencyStore(
+    max_entries=int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', 10000)),
+    ttl_seconds=int(os.getenv('IDEMPOTENCY_TTL_SECONDS', 600))
+)
+
+# --- worker 进程初始化 ---
+def init_worker():
+    """在每个 worker 进程启动时 (fork 之后) 调用：准备本进程的空闲连接栈，清空继承来的进程内缓存。
+    预加载阶段构建的检索索引通过写时复制在 worker 间共享，无需重建。"""
+    init_db_pool()
+    response_cache.clear()
+
+@app.errorhandler(mysql.connector.Error)
+def handle_db_unavailable(err):
+    """路由未捕获的数据库错误 (重试新连接后 conn.cursor() 仍失败) 按数据库不可用返回 503"""
+    print(f"数据库连接错误: {err}")
+    return jsonify({"message": "数据库服务暂时不可用"}), 503
+
+@app.after_request
+def add_retry_after(response):
+    """熔断期间的 503 响应告知客户端多久之后重试"""
+    if response.status_code == 503 and db_breaker.state != CLOSED:
+        response.headers['Retry-After'] = str(max(1, math.ceil(db_breaker.retry_after())))
+    return response
 
 # --- 身份认证中间件 (装饰器) ---
 def require_auth(allowed_roles=[]):
@@ -58,12 +398,77 @@ def require_auth(allowed_roles=[]):
                 return jsonify({"message": "未授权：Token 已过期"}), 401
             except jwt.InvalidTokenError:
                 return jsonify({"message": "未授权：无效的 Token"}), 401
+            except mysql.connector.Error:
+                raise  # 路由 try 之外的数据库错误 (如 conn.cursor() 失败) 交给 handle_db_unavailable
             except Exception as e:
                 print(f"Token 验证过程中发生未知错误: {e}")
                 return jsonify({"message": "服务器内部错误"}), 500
         return decorated_function
     return decorator
 
+def cache_user_response(namespace):
+    """装饰器工厂函数，按当前用户缓存 200 响应体，并支持 ETag / If-None-Match 返回 304。
+    须放在 require_auth 之后 (内层)，写路径通过 response_cache.bump()/bump_all() 使缓存失效。"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user_id = kwargs['current_user'].get('id')
+            # 必须在查询数据库之前读取版本号
+            version = response_cache.version(namespace, user_id)
+            entry = response_cache.get(namespace, user_id, version)
+            cache_status = 'HIT'
+            if entry is None:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200: return response
+                entry = response_cache.put(namespace, user_id, version, response.get_data())
+                cache_status = 'MISS'
+            if request.if_none_match.contains(entry.etag):
+                response = app.response_class(status=304)
+            else:
+                response = app.response_class(entry.body, mimetype='application/json')
+            response.set_etag(entry.etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.headers['X-Cache'] = cache_status
+            return response
+        return decorated_function
+    return decorator
+
+def idempotent(f):
+    """装饰器：按请求头 Idempotency-Key 去重，须放在 require_auth 之后 (内层)。
+    同一用户、同一接口、同一个键的重复请求直接返回首次请求的响应，不访问数据库；
+    并发的重复请求等待首次请求完成，等待超时返回 503 + Retry-After。
+    5xx 响应不保存，客户端可用同一个键重试。"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        idem_key = request.headers.get('Idempotency-Key')
+        if not idem_key: return f(*args, **kwargs)
+        if len(idem_key) > 255: return jsonify({"message": "Idempotency-Key 过长"}), 400
+        key = (kwargs['current_user'].get('id'), request.method, request.path, idem_key)
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        outcome, stored = idempotency_store.begin(key, fingerprint)
+        if outcome == idempotency.MISMATCH:
+            return jsonify({"message": "Idempotency-Key 已用于不同的请求内容"}), 422
+        if outcome == idempotency.BUSY:
+            response = jsonify({"message": "相同的请求正在处理中，请稍后重试"})
+            response.status_code = 503
+            response.headers['Retry-After'] = '1'
+            return response
+        if outcome == idempotency.REPLAY:
+            response = app.response_class(stored.body, status=stored.status_code, mimetype=stored.mimetype)
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        try:
+            response = app.make_response(f(*args, **kwargs))
+        except Exception:
+            idempotency_store.release(key)
+            raise
+        if response.status_code >= 500:
+            idempotency_store.release(key)
+        else:
+            idempotency_store.complete(key, StoredResponse(response.status_code, response.get_data(), response.mimetype))
+        return response
+    return decorated_function
+
 # --- API 路由定义 ---
 
 # === 认证相关路由 ===
@@ -85,13 +490,12 @@ def register_student():
         sql = "INSERT INTO students (student_id, name, gender, age, password_hash) VALUES (%s, %s, %s, %s, %s)"
         val = (student_id, name, gender, age, hashed_password.decode('utf-8'))
         cursor.execute(sql, val)
-        conn.commit()
         return jsonify({"message": "学生注册成功"}), 201
     except mysql.connector.Error as err: conn.rollback(); print(f"学生注册数据库操作失败: {err}"); return jsonify({"message": "服务器内部错误，注册失败"}), 500
     except Exception as e: conn.rollback(); print(f"学生注册时发生未知错误: {e}"); return jsonify({"message": "服务器内部错误，注册失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 学生登录 ---
 @app.route('/api/auth/login/student', methods=['POST'])
@@ -117,7 +521,7 @@ def login_student():
     except Exception as e: print(f"学生登录时发生未知错误: {e}"); return jsonify({"message": "服务器内部错误，登录失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 教师注册 ---
 @app.route('/api/auth/register/teacher', methods=['POST'])
@@ -136,13 +540,12 @@ def register_teacher():
         sql = "INSERT INTO teachers (teacher_id, name, age, title, password_hash) VALUES (%s, %s, %s, %s, %s)"
         val = (teacher_id, name, age, title, hashed_password.decode('utf-8'))
         cursor.execute(sql, val)
-        conn.commit()
         return jsonify({"message": "教师注册成功"}), 201
     except mysql.connector.Error as err: conn.rollback(); print(f"教师注册数据库操作失败: {err}"); return jsonify({"message": "服务器内部错误，注册失败"}), 500
     except Exception as e: conn.rollback(); print(f"教师注册时发生未知错误: {e}"); return jsonify({"message": "服务器内部错误，注册失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 教师登录 ---
 @app.route('/api/auth/login/teacher', methods=['POST'])
@@ -168,7 +571,7 @@ def login_teacher():
     except Exception as e: print(f"教师登录时发生未知错误: {e}"); return jsonify({"message": "服务器内部错误，登录失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 管理员登录 ---
 @app.route('/api/auth/login/admin', methods=['POST'])
@@ -194,7 +597,7 @@ def login_admin():
     except Exception as e: print(f"管理员登录时发生未知错误: {e}"); return jsonify({"message": "服务器内部错误，登录失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # === 课程相关路由 ===
 # (获取已批准课程, 上传课程, 获取教师课程, 获取待审批课程, 批准/拒绝课程 代码保持不变)
@@ -224,11 +627,12 @@ def get_approved_courses(current_user):
     except Exception as e: print(f"获取已批准课程列表时发生未知错误: {e}"); return jsonify({"message": "获取课程列表失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 教师上传课程 ---
 @app.route('/api/courses', methods=['POST'])
 @require_auth(allowed_roles=['teacher'])
+@idempotent
 def upload_course(current_user):
     data = request.get_json()
     if not data: return jsonify({"message": "请求体不能为空且必须是 JSON 格式"}), 400
@@ -248,13 +652,13 @@ def upload_course(current_user):
         sql = "INSERT INTO courses (course_id, course_name, hours, credits, teacher_id, approval_status) VALUES (%s, %s, %s, %s, %s, 'pending')"
         val = (course_id, course_name, hours_val, credits_val, teacher_id)
         cursor.execute(sql, val)
-        conn.commit()
+        _remember_pending_course({'course_id': course_id, 'course_name': course_name, 'hours': hours_val, 'credits': credits_val, 'teacher_name': current_user.get('name')})
         return jsonify({"message": "课程上传成功，等待管理员审批"}), 201
     except mysql.connector.Error as err: conn.rollback(); print(f"上传课程数据库操作失败: {err}"); return jsonify({"message": "服务器内部错误，上传失败"}), 500
     except Exception as e: conn.rollback(); print(f"上传课程时发生未知错误: {e}"); return jsonify({"message": "服务器内部错误，上传失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 教师查看自己上传的课程 ---
 @app.route('/api/courses/my', methods=['GET'])
@@ -279,7 +683,7 @@ def get_my_courses(current_user):
     except Exception as e: print(f"获取教师课程时发生未知错误: {e}"); return jsonify({"message": "获取我的课程列表失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 管理员获取待审批课程列表 ---
 @app.route('/api/courses/pending', methods=['GET'])
@@ -312,7 +716,7 @@ def get_pending_courses(current_user):
         print(f"获取待审批课程时发生未知错误: {e}"); return jsonify({"message": "获取待审批课程列表失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 管理员批准课程 ---
 @app.route('/api/courses/<string:course_id>/approve', methods=['PUT'])
@@ -333,23 +737,26 @@ def approve_course(current_user, course_id):
             WHERE course_id = %s AND approval_status = 'pending'
         """
         val = (admin_id, course_id)
+        # 条件更新本身即完成状态检查；仅在未更新任何行时才查询原因
         cursor.execute(sql, val)
-        affected_rows = cursor.rowcount
-        conn.commit()
-        if affected_rows == 0:
+        if cursor.rowcount == 0:
             cursor.execute("SELECT approval_status FROM courses WHERE course_id = %s", (course_id,))
             result = cursor.fetchone()
             if not result: return jsonify({"message": "批准失败：课程未找到"}), 404
             elif result[0] != 'pending': return jsonify({"message": "批准失败：该课程当前状态无法批准"}), 409
             else: return jsonify({"message": "批准操作未影响任何行"}), 500
-        else: return jsonify({"message": f"课程 {course_id} 已成功批准"}), 200
+        else:
+            course = _take_pending_course(course_id)
+            if course: _index_course(course); _search_index_changed(ChangeLog.ADD, 'course', course_id)
+            else: _queue_search_doc('course', course_id)
+            return jsonify({"message": f"课程 {course_id} 已成功批准"}), 200
     except mysql.connector.Error as err:
         conn.rollback(); print(f"批准课程数据库操作失败: {err}"); return jsonify({"message": "服务器内部错误，批准失败"}), 500
     except Exception as e:
         conn.rollback(); print(f"批准课程时发生未知错误: {e}"); return jsonify({"message": "服务器内部错误，批准失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 管理员拒绝课程 ---
 @app.route('/api/courses/<string:course_id>/reject', methods=['PUT'])
@@ -370,23 +777,25 @@ def reject_course(current_user, course_id):
             WHERE course_id = %s AND approval_status = 'pending'
         """
         val = (admin_id, course_id)
+        # 条件更新本身即完成状态检查；仅在未更新任何行时才查询原因
         cursor.execute(sql, val)
-        affected_rows = cursor.rowcount
-        conn.commit()
-        if affected_rows == 0:
+        if cursor.rowcount == 0:
             cursor.execute("SELECT approval_status FROM courses WHERE course_id = %s", (course_id,))
             result = cursor.fetchone()
             if not result: return jsonify({"message": "拒绝失败：课程未找到"}), 404
             elif result[0] != 'pending': return jsonify({"message": "拒绝失败：该课程当前状态无法拒绝"}), 409
             else: return jsonify({"message": "拒绝操作未影响任何行"}), 500
-        else: return jsonify({"message": f"课程 {course_id} 已成功拒绝"}), 200
+        else:
+            _take_pending_course(course_id)
+            search_index.remove('course', course_id); _search_index_changed(ChangeLog.REMOVE, 'course', course_id)
+            return jsonify({"message": f"课程 {course_id} 已成功拒绝"}), 200
     except mysql.connector.Error as err:
         conn.rollback(); print(f"拒绝课程数据库操作失败: {err}"); return jsonify({"message": "服务器内部错误，拒绝失败"}), 500
     except Exception as e:
         conn.rollback(); print(f"拒绝课程时发生未知错误: {e}"); return jsonify({"message": "服务器内部错误，拒绝失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 
 # === 选课相关路由 ===
@@ -394,6 +803,7 @@ def reject_course(current_user, course_id):
 # --- 学生选课 ---
 @app.route('/api/courses/<string:course_id>/select', methods=['POST'])
 @require_auth(allowed_roles=['student'])
+@idempotent
 def select_course(current_user, course_id):
     """学生选择一门课程"""
     student_id = current_user.get('id')
@@ -402,23 +812,33 @@ def select_course(current_user, course_id):
     if not conn: return jsonify({"message": "数据库服务暂时不可用"}), 503
     cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT approval_status FROM courses WHERE course_id = %s", (course_id,))
-        course = cursor.fetchone()
-        if not course: return jsonify({"message": "选课失败：课程不存在"}), 404
-        if course['approval_status'] != 'approved': return jsonify({"message": "选课失败：该课程尚未批准或已被拒绝"}), 400
-        cursor.execute("SELECT student_id FROM course_selections WHERE student_id = %s AND course_id = %s", (student_id, course_id))
-        if cursor.fetchone(): return jsonify({"message": "您已选择此课程"}), 409
-        sql = "INSERT INTO course_selections (student_id, course_id) VALUES (%s, %s)"
-        val = (student_id, course_id)
-        cursor_insert = conn.cursor()
-        cursor_insert.execute(sql, val)
-        conn.commit()
-        cursor_insert.close()
+        # 课程已批准且尚未选择时才插入，一条语句完成检查和插入
+        sql = """
+            INSERT INTO course_selections (student_id, course_id)
+            SELECT %s, c.course_id FROM courses c
+            WHERE c.course_id = %s AND c.approval_status = 'approved'
+              AND NOT EXISTS (SELECT 1 FROM course_selections cs WHERE cs.student_id = %s AND cs.course_id = %s)
+        """
+        val = (student_id, course_id, student_id, course_id)
+        cursor.execute(sql, val)
+        if cursor.rowcount == 0:
+            cursor.execute("""
+                SELECT c.approval_status,
+                       EXISTS (SELECT 1 FROM course_selections cs WHERE cs.student_id = %s AND cs.course_id = c.course_id) AS selected
+                FROM courses c WHERE c.course_id = %s
+            """, (student_id, course_id))
+            course = cursor.fetchone()
+            if not course: return jsonify({"message": "选课失败：课程不存在"}), 404
+            if course['approval_status'] != 'approved': return jsonify({"message": "选课失败：该课程尚未批准或已被拒绝"}), 400
+            if course['selected']: return jsonify({"message": "您已选择此课程"}), 409
+            return jsonify({"message": "选课操作未影响任何行"}), 500
+        response_cache.bump('selections', student_id)
         return jsonify({"message": f"课程 {course_id} 选择成功"}), 201
     except mysql.connector.Error as err:
         conn.rollback()
         print(f"学生 {student_id} 选课 {course_id} 数据库操作失败: {err}")
         if err.errno == 1452: return jsonify({"message": "选课失败：关联的学生或课程信息无效"}), 400
+        if err.errno == 1062: return jsonify({"message": "您已选择此课程"}), 409
         return jsonify({"message": "服务器内部错误，选课失败"}), 500
     except Exception as e:
         conn.rollback()
@@ -426,12 +846,12 @@ def select_course(current_user, course_id):
         return jsonify({"message": "服务器内部错误，选课失败"}), 500
     finally:
         if cursor: cursor.close()
-        # if 'cursor_insert' in locals() and cursor_insert and cursor_insert.is_connected(): cursor_insert.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 学生查看自己的选课列表 ---
 @app.route('/api/selections/my', methods=['GET'])
 @require_auth(allowed_roles=['student'])
+@cache_user_response('selections')
 def get_my_selections(current_user):
     """获取当前登录学生已选的课程列表及相关信息"""
     student_id = current_user.get('id')
@@ -476,7 +896,7 @@ def get_my_selections(current_user):
         return jsonify({"message": "获取选课列表失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 学生退选 ---
 @app.route('/api/selections/<string:course_id>', methods=['DELETE'])
@@ -492,13 +912,13 @@ def deselect_course(current_user, course_id):
         sql = "DELETE FROM course_selections WHERE student_id = %s AND course_id = %s"
         val = (student_id, course_id)
         cursor.execute(sql, val)
-        affected_rows = cursor.rowcount
-        conn.commit()
-        if affected_rows == 0:
+        if cursor.rowcount == 0:
             cursor.execute("SELECT course_id FROM courses WHERE course_id = %s", (course_id,))
             if not cursor.fetchone(): return jsonify({"message": "退选失败：课程不存在"}), 404
             else: return jsonify({"message": "退选失败：您未选择此课程"}), 404
-        else: return jsonify({"message": f"课程 {course_id} 已成功退选"}), 200
+        else:
+            response_cache.bump('selections', student_id)
+            return jsonify({"message": f"课程 {course_id} 已成功退选"}), 200
     except mysql.connector.Error as err:
         conn.rollback()
         print(f"学生 {student_id} 退选课程 {course_id} 数据库操作失败: {err}")
@@ -509,13 +929,14 @@ def deselect_course(current_user, course_id):
         return jsonify({"message": "服务器内部错误，退选失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # === 留言相关路由 === (新增)
 
 # --- 学生提交留言 ---
 @app.route('/api/messages', methods=['POST'])
 @require_auth(allowed_roles=['student'])
+@idempotent
 def submit_message(current_user):
     """学生提交一条新的留言"""
     student_id = current_user.get('id')
@@ -532,7 +953,7 @@ def submit_message(current_user):
         sql = "INSERT INTO messages (student_id, content, approval_status) VALUES (%s, %s, 'pending')"
         val = (student_id, content)
         cursor.execute(sql, val)
-        conn.commit()
+        response_cache.bump('messages', student_id)
         return jsonify({"message": "留言提交成功，等待管理员审批"}), 201
     except mysql.connector.Error as err:
         conn.rollback()
@@ -545,7 +966,7 @@ def submit_message(current_user):
         return jsonify({"message": "服务器内部错误，提交失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 管理员获取待审批留言列表 ---
 @app.route('/api/messages/pending', methods=['GET'])
@@ -578,7 +999,7 @@ def get_pending_messages(current_user):
         return jsonify({"message": "获取待审批留言列表失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 管理员批准留言 ---
 @app.route('/api/messages/<int:message_id>/approve', methods=['PUT'])
@@ -597,23 +1018,25 @@ def approve_message(current_user, message_id):
             WHERE message_id = %s AND approval_status = 'pending'
         """
         val = (admin_id, message_id)
+        # 条件更新本身即完成状态检查；仅在未更新任何行时才查询原因
         cursor.execute(sql, val)
-        affected_rows = cursor.rowcount
-        conn.commit()
-        if affected_rows == 0:
+        if cursor.rowcount == 0:
             cursor.execute("SELECT approval_status FROM messages WHERE message_id = %s", (message_id,))
             result = cursor.fetchone()
             if not result: return jsonify({"message": "批准失败：留言未找到"}), 404
             elif result[0] != 'pending': return jsonify({"message": "批准失败：该留言当前状态无法批准"}), 409
             else: return jsonify({"message": "批准操作未影响任何行"}), 500
-        else: return jsonify({"message": f"留言 {message_id} 已成功批准"}), 200
+        else:
+            response_cache.bump_all('messages')
+            _queue_search_doc('message', message_id)
+            return jsonify({"message": f"留言 {message_id} 已成功批准"}), 200
     except mysql.connector.Error as err:
         conn.rollback(); print(f"批准留言数据库操作失败: {err}"); return jsonify({"message": "服务器内部错误，批准失败"}), 500
     except Exception as e:
         conn.rollback(); print(f"批准留言时发生未知错误: {e}"); return jsonify({"message": "服务器内部错误，批准失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- 管理员拒绝留言 ---
 @app.route('/api/messages/<int:message_id>/reject', methods=['PUT'])
@@ -632,27 +1055,30 @@ def reject_message(current_user, message_id):
             WHERE message_id = %s AND approval_status = 'pending'
         """
         val = (admin_id, message_id)
+        # 条件更新本身即完成状态检查；仅在未更新任何行时才查询原因
         cursor.execute(sql, val)
-        affected_rows = cursor.rowcount
-        conn.commit()
-        if affected_rows == 0:
+        if cursor.rowcount == 0:
             cursor.execute("SELECT approval_status FROM messages WHERE message_id = %s", (message_id,))
             result = cursor.fetchone()
             if not result: return jsonify({"message": "拒绝失败：留言未找到"}), 404
             elif result[0] != 'pending': return jsonify({"message": "拒绝失败：该留言当前状态无法拒绝"}), 409
             else: return jsonify({"message": "拒绝操作未影响任何行"}), 500
-        else: return jsonify({"message": f"留言 {message_id} 已成功拒绝"}), 200
+        else:
+            response_cache.bump_all('messages')
+            search_index.remove('message', message_id); _search_index_changed(ChangeLog.REMOVE, 'message', message_id)
+            return jsonify({"message": f"留言 {message_id} 已成功拒绝"}), 200
     except mysql.connector.Error as err:
         conn.rollback(); print(f"拒绝留言数据库操作失败: {err}"); return jsonify({"message": "服务器内部错误，拒绝失败"}), 500
     except Exception as e:
         conn.rollback(); print(f"拒绝留言时发生未知错误: {e}"); return jsonify({"message": "服务器内部错误，拒绝失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
 
 # --- (可选) 学生查看自己的留言 ---
 @app.route('/api/messages/my', methods=['GET'])
 @require_auth(allowed_roles=['student'])
+@cache_user_response('messages')
 def get_my_messages(current_user):
     """获取当前登录学生提交的留言列表及其状态"""
     student_id = current_user.get('id')
@@ -685,8 +1111,43 @@ def get_my_messages(current_user):
         return jsonify({"message": "获取我的留言列表失败"}), 500
     finally:
         if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        if conn: conn.close()
+
+
+# === 检索相关路由 ===
+
+# --- 检索课程与已批准留言 ---
+@app.route('/api/search', methods=['GET'])
+@require_auth(allowed_roles=['student', 'teacher', 'admin'])
+def search(current_user):
+    """基于进程内倒排索引检索课程名、教师名、课程号和已批准留言内容，支持分页"""
+    query = request.args.get('q', '').strip()
+    doc_type = request.args.get('type') or None
+    if not query: return jsonify({"message": "检索关键词不能为空"}), 400
+    if doc_type and doc_type not in DOC_TYPES: return jsonify({"message": "检索类型必须是 course 或 message"}), 400
+    try:
+        page = int(request.args.get('page', 1)); page_size = int(request.args.get('page_size', 20))
+    except (ValueError, TypeError): return jsonify({"message": "分页参数必须是有效的整数"}), 400
+    if page < 1 or not 1 <= page_size <= 100: return jsonify({"message": "分页参数超出范围"}), 400
+    if not _sync_search_index():
+        return jsonify({"message": "数据库服务暂时不可用"}), 503
+    _flush_search_backlog()
+    total, results = search_index.search(query, doc_type=doc_type, page=page, page_size=page_size)
+    return jsonify({"query": query, "total": total, "page": page, "page_size": page_size, "results": results})
 
+# === 运行状态监控路由 ===
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    """供负载均衡和监控探测：熔断器未闭合 (打开或半开探测中) 时返回 503"""
+    state = db_breaker.state
+    if state != CLOSED: return jsonify({"status": "degraded", "db_breaker": state}), 503
+    return jsonify({"status": "ok", "db_breaker": state})
+
+@app.route('/api/admin/stats', methods=['GET'])
+@require_auth(allowed_roles=['admin'])
+def get_runtime_stats(current_user):
+    """返回进程内缓存、检索索引、数据库熔断器和幂等键存储的运行统计 (命中率、内存占用、熔断状态等)"""
+    return jsonify({"response_cache": response_cache.stats(), "search_index": search_index.stats(), "db_breaker": db_breaker.stats(), "idempotency": idempotency_store.stats()})
 
 # === 提供前端静态文件的路由 ===
 @app.route('/')
@@ -706,5 +1167,8 @@ def serve_static_or_frontend(path):
 
 # === 应用启动入口 ===
 if __name__ == '__main__':
+    # 开发服务器；生产环境请使用 serve.py
     port = int(os.getenv('PORT', 5000))
+    init_worker()
+    build_search_index()
     app.run(host='0.0.0.0', port=port, debug=app.config['DEBUG'])
\ No newline at end of file
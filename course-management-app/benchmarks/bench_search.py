@@ -0,0 +1,123 @@
+# course-management-app/benchmarks/bench_search.py
+"""对比倒排索引检索与 LIKE '%...%' 全表扫描的查询耗时。
+
+默认使用内存 SQLite 作为 LIKE 扫描的基准 (无需数据库)；
+加上 --mysql 参数时改为对 .env 中配置的 MySQL 数据库执行 LIKE 查询。
+
+用法: python benchmarks/bench_search.py [--courses 20000] [--rounds 200] [--mysql]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from search_index import SearchIndex  # noqa: E402
+
+SUBJECTS = ['数据库', '操作系统', '计算机网络', '编译原理', '数据结构', '软件工程', '人工智能', '机器学习',
+            '线性代数', '概率论', '大学物理', '离散数学', 'Python', 'Java', 'Web', 'Linux']
+SUFFIXES = ['原理', '导论', '实践', '设计', '基础', '进阶', '实验', 'Advanced', 'Basics']
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗'
+GIVEN = '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚'
+QUERIES = ['数据库', '原理', '王', '机器学习', 'pyth', '网络 实践', '李明', 'advanced', '结构设计', '不存在的课程']
+
+
+def make_corpus(n_courses, seed=42):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n_courses):
+        name = f"{rnd.choice(SUBJECTS)}{rnd.choice(SUFFIXES)}{rnd.randint(1, 9)}"
+        teacher = rnd.choice(SURNAMES) + ''.join(rnd.choice(GIVEN) for _ in range(rnd.randint(1, 2)))
+        rows.append((f"C{i:06d}", name, teacher))
+    return rows
+
+
+def like_sql(placeholder, n_terms):
+    """返回 (计数 SQL, 分页 SQL)，与 /api/search 一样需要总命中数和第一页结果。
+    与索引的 AND 语义一致：每个关键词须命中任一字段，多个关键词之间取 AND。"""
+    term = (f"(course_name LIKE {placeholder} OR teacher_name LIKE {placeholder} "
+            f"OR course_id LIKE {placeholder})")
+    where = "FROM bench_courses WHERE " + " AND ".join([term] * n_terms)
+    return (f"SELECT COUNT(*) {where}",
+            f"SELECT course_id, course_name, teacher_name {where} ORDER BY course_id LIMIT 20")
+
+
+def setup_sqlite(rows):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE bench_courses (course_id TEXT PRIMARY KEY, course_name TEXT, teacher_name TEXT)")
+    conn.executemany("INSERT INTO bench_courses VALUES (?, ?, ?)", rows)
+    return conn, '?'
+
+
+def setup_mysql(rows):
+    import mysql.connector
+    from dotenv import load_dotenv
+    load_dotenv()
+    conn = mysql.connector.connect(host=os.getenv('DB_HOST'), user=os.getenv('DB_USER'), password=os.getenv('DB_PASSWORD'),
+                                   database=os.getenv('DB_NAME'), auth_plugin='mysql_native_password')
+    cursor = conn.cursor()
+    cursor.execute("CREATE TEMPORARY TABLE bench_courses (course_id VARCHAR(20) PRIMARY KEY, course_name VARCHAR(100), teacher_name VARCHAR(50)) DEFAULT CHARSET=utf8mb4")
+    cursor.executemany("INSERT INTO bench_courses VALUES (%s, %s, %s)", rows)
+    conn.commit()
+    cursor.close()
+    return conn, '%s'
+
+
+def run_like(conn, placeholder, query, rounds):
+    """返回 (LIKE 命中数, 每次查询耗时)；多个关键词按空格切分后取 AND"""
+    terms = query.split()
+    sqls = like_sql(placeholder, len(terms))
+    params = [f"%{term}%" for term in terms for _ in range(3)]
+    cursor = conn.cursor()
+    cursor.execute(sqls[0], params)
+    hits = cursor.fetchone()[0]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for sql in sqls:
+            cursor.execute(sql, params)
+            cursor.fetchall()
+    elapsed = time.perf_counter() - start
+    cursor.close()
+    return hits, elapsed / rounds
+
+
+def run_index(index, query, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        index.search(query, page=1, page_size=20)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--courses', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--mysql', action='store_true', help='使用 .env 中配置的 MySQL 执行 LIKE 查询')
+    args = parser.parse_args()
+
+    rows = make_corpus(args.courses)
+    start = time.perf_counter()
+    index = SearchIndex()
+    for course_id, name, teacher in rows:
+        index.add('course', course_id, {'course_id': course_id, 'course_name': name, 'teacher_name': teacher},
+                  {'course_id': course_id, 'course_name': name, 'teacher_name': teacher})
+    build_ms = (time.perf_counter() - start) * 1000
+    conn, placeholder = setup_mysql(rows) if args.mysql else setup_sqlite(rows)
+    backend = 'MySQL' if args.mysql else 'SQLite'
+
+    print(f"课程数: {args.courses}, 每个查询执行 {args.rounds} 次, 索引构建耗时 {build_ms:.1f} ms, 词元数 {index.stats()['tokens']}")
+    # 索引按词元 (英文单词前缀) 匹配，LIKE 按任意子串匹配 (如 JavaAdvanced3 中的 advanced)，命中数可能不同，一并列出便于核对
+    print(f"{'查询':<12}{'索引命中':>8}{'LIKE命中':>10}{'索引(ms)':>12}{backend + ' LIKE(ms)':>18}{'加速比':>10}")
+    for query in QUERIES:
+        total, _ = index.search(query)
+        t_index = run_index(index, query, args.rounds) * 1000
+        like_hits, t_like = run_like(conn, placeholder, query, args.rounds)
+        t_like *= 1000
+        print(f"{query:<12}{total:>8}{like_hits:>10}{t_index:>12.3f}{t_like:>18.3f}{t_like / t_index:>10.1f}x")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# course-management-app/benchmarks/bench_startup.py
+"""对比开发服务器 (python app.py) 与 serve.py 的冷启动时间和每个进程的内存占用。
+
+冷启动时间为启动命令到首个 GET / 返回 200 的耗时。内存数据读取自
+/proc/<pid>/smaps_rollup (仅 Linux)：PSS 按共享页面的进程数分摊，
+Shared 为与其他进程共享的页面 (预加载后 fork 的 worker 与 master 共享)。
+
+用法: python benchmarks/bench_startup.py [--workers 4] [--threads 4]
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1) as resp:
+                if resp.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.02)
+    return False
+
+
+def children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def memory_kb(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def run(label, cmd, port, settle=1.0):
+    env = dict(os.environ, PORT=str(port), FLASK_DEBUG='0')
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(port):
+            print(f"{label}: 启动超时")
+            return
+        cold_start = time.perf_counter() - start
+        time.sleep(settle)
+        print(f"\n{label}: 冷启动 {cold_start * 1000:.0f} ms")
+        print(f"  {'进程':<14}{'RSS(MB)':>10}{'PSS(MB)':>10}{'Shared(MB)':>12}{'Private(MB)':>13}")
+        total_pss = 0
+        for role, pid in [('master', proc.pid)] + [('worker', c) for c in children(proc.pid)]:
+            mem = memory_kb(pid)
+            total_pss += mem['pss']
+            print(f"  {role + ' ' + str(pid):<14}{mem['rss'] / 1024:>10.1f}{mem['pss'] / 1024:>10.1f}"
+                  f"{mem['shared'] / 1024:>12.1f}{mem['private'] / 1024:>13.1f}")
+        print(f"  合计 PSS: {total_pss / 1024:.1f} MB")
+        stop = time.perf_counter()
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+        print(f"  SIGTERM 到退出: {(time.perf_counter() - stop) * 1000:.0f} ms")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    run('开发服务器 (python app.py)', [sys.executable, 'app.py'], free_port())
+    port = free_port()
+    run(f'serve.py ({args.workers} 进程 x {args.threads} 线程)',
+        [sys.executable, 'serve.py', '--workers', str(args.workers), '--threads', str(args.threads),
+         '--bind', f'127.0.0.1:{port}'], port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+# course-management-app/benchmarks/bench_write_paths.py
+"""统计选课、退选、审批等写接口每个请求与 MySQL 服务器之间的往返次数和平均耗时。
+
+计数取自服务器端的全局状态变量，而不是在客户端统计 execute() 调用，因此连接池的 ping、
+会话重置等驱动内部发出的命令也会计入：
+    Questions           客户端发出的语句数 (含 COMMIT/ROLLBACK)
+    Com_admin_commands  COM_PING、COM_RESET_CONNECTION 等管理命令数
+    Connections         新建的连接数 (每次建连还有握手认证的多次往返)
+读取计数器的 SHOW 语句本身也会计入 Questions，脚本启动时先测量空闲间隔的增量并扣除。
+
+改写前的数据取自 --baseline 指定版本的 app.py (默认为写接口改写之前的提交，
+先 SELECT 检查再写入、写入后单独 COMMIT、失败后再查询，使用 mysql-connector 自带的连接池)：
+从 git 读出源码加载为独立模块，用同样的场景和同样的服务器计数器测量，
+连接池取连接时的 ping、会话重置和建连都与改写后一样计入，两列可以直接对比。
+
+需要 .env 中配置可写的 MySQL 测试库，且运行期间没有其他客户端访问该服务器 (计数器是全局的)。
+脚本会插入以 BENCH_ 开头的测试数据，结束后删除。
+
+用法: python benchmarks/bench_write_paths.py [--rounds 50] [--baseline 03f3959^]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import types
+from datetime import datetime, timezone, timedelta
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, APP_DIR)
+import jwt  # noqa: E402
+import mysql.connector  # noqa: E402
+import app as app_module  # noqa: E402
+
+PREFIX = 'BENCH_'
+TEACHER, STUDENT, ADMIN = PREFIX + 'T1', PREFIX + 'S1', PREFIX + 'A1'
+APPROVED, PENDING = PREFIX + 'C_OK', PREFIX + 'C_PENDING'
+
+# 写接口改写 (单条条件语句 + autocommit) 之前的提交
+DEFAULT_BASELINE = '03f3959^'
+
+STATUS_VARS = ('Questions', 'Com_admin_commands', 'Connections')
+
+
+class ServerCounters:
+    """用一个独立连接读取服务器端的全局计数器"""
+
+    def __init__(self, calibration_rounds=20):
+        self._conn = mysql.connector.connect(**app_module._db_config())
+        self._cursor = self._conn.cursor()
+        self._idle = [0.0] * len(STATUS_VARS)
+        samples = [self.delta(self.read(), self.read()) for _ in range(calibration_rounds)]
+        self._idle = [sum(column) / calibration_rounds for column in zip(*samples)]
+
+    def read(self):
+        self._cursor.execute("SHOW GLOBAL STATUS WHERE Variable_name IN ('Questions', 'Com_admin_commands', 'Connections')")
+        values = {str(name): int(value) for name, value in self._cursor.fetchall()}
+        return [values[name] for name in STATUS_VARS]
+
+    def delta(self, before, after):
+        """两次读取之间的增量，已扣除读取本身造成的部分"""
+        return [a - b - idle for a, b, idle in zip(after, before, self._idle)]
+
+    def close(self):
+        self._cursor.close()
+        self._conn.close()
+
+
+def load_baseline(revision):
+    """从 git 读出指定版本的 app.py，加载为独立模块 (静态目录、.env 与当前版本相同)"""
+    source = subprocess.run(['git', 'show', f'{revision}:./app.py'], cwd=APP_DIR,
+                            capture_output=True, text=True, encoding='utf-8', check=True).stdout
+    module = types.ModuleType('app_baseline')
+    module.__file__ = os.path.join(APP_DIR, 'app_baseline.py')
+    sys.modules[module.__name__] = module  # Flask 通过 sys.modules 确定应用根目录
+    exec(compile(source, f'{revision}:app.py', 'exec'), module.__dict__)
+    return module
+
+
+def token(user_id, role):
+    payload = {'id': user_id, 'name': user_id, 'role': role, 'exp': datetime.now(timezone.utc) + timedelta(hours=1)}
+    return {'Authorization': 'Bearer ' + jwt.encode(payload, app_module.app.config['SECRET_KEY'], algorithm='HS256')}
+
+
+def execute(sql, val=()):
+    conn = mysql.connector.connect(**app_module._db_config())
+    cursor = conn.cursor()
+    cursor.execute(sql, val)
+    last_id = cursor.lastrowid
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return last_id
+
+
+def setup():
+    cleanup()
+    execute("INSERT INTO teachers (teacher_id, name, password_hash) VALUES (%s, 'bench', 'x')", (TEACHER,))
+    execute("INSERT INTO students (student_id, name, password_hash) VALUES (%s, 'bench', 'x')", (STUDENT,))
+    execute("INSERT INTO administrators (admin_id, name, password_hash) VALUES (%s, 'bench', 'x')", (ADMIN,))
+    for course_id, status in ((APPROVED, 'approved'), (PENDING, 'pending')):
+        execute("INSERT INTO courses (course_id, course_name, teacher_id, approval_status) VALUES (%s, 'bench', %s, %s)",
+                (course_id, TEACHER, status))
+
+
+def cleanup():
+    execute("DELETE FROM course_selections WHERE student_id = %s", (STUDENT,))
+    execute("DELETE FROM messages WHERE student_id = %s", (STUDENT,))
+    execute("DELETE FROM courses WHERE course_id LIKE %s", (PREFIX + '%',))
+    for table, column in (('students', 'student_id'), ('teachers', 'teacher_id'), ('administrators', 'admin_id')):
+        execute(f"DELETE FROM {table} WHERE {column} LIKE %s", (PREFIX + '%',))
+
+
+def new_pending_course(i):
+    course_id = f"{PREFIX}P{i}"
+    execute("INSERT INTO courses (course_id, course_name, teacher_id, approval_status) VALUES (%s, 'bench', %s, 'pending')",
+            (course_id, TEACHER))
+    return course_id
+
+
+def new_pending_message():
+    return execute("INSERT INTO messages (student_id, content, approval_status) VALUES (%s, 'bench', 'pending')", (STUDENT,))
+
+
+def measure(counters, label, rounds, prepare, request, expected):
+    """prepare(i) 准备状态 (不计数) 并返回请求参数；request(arg) 发出请求。
+    返回每个请求平均的 (Questions, 管理命令, 新建连接, 耗时毫秒)"""
+    totals, elapsed = [0.0] * len(STATUS_VARS), 0.0
+    for i in range(rounds):
+        arg = prepare(i)
+        before = counters.read()
+        start = time.perf_counter()
+        response = request(arg)
+        elapsed += time.perf_counter() - start
+        totals = [t + d for t, d in zip(totals, counters.delta(before, counters.read()))]
+        assert response.status_code == expected, (label, response.status_code, response.get_json())
+    return [t / rounds for t in totals] + [elapsed / rounds * 1000]
+
+
+def run_scenarios(module, counters, n):
+    """对给定版本的应用依次执行各场景，返回 [(场景, 状态码, 测量结果)]"""
+    setup()
+    client = module.app.test_client()
+    student, admin = token(STUDENT, 'student'), token(ADMIN, 'admin')
+    course_ids, message_ids = [], []
+
+    def select(course_id):
+        return client.post(f'/api/courses/{course_id}/select', headers=student)
+
+    def deselect(course_id):
+        return client.delete(f'/api/selections/{course_id}', headers=student)
+
+    def unselect(i):
+        execute("DELETE FROM course_selections WHERE student_id = %s", (STUDENT,))
+        return APPROVED
+
+    def reselect(i):
+        unselect(i)
+        execute("INSERT INTO course_selections (student_id, course_id) VALUES (%s, %s)", (STUDENT, APPROVED))
+        return APPROVED
+
+    def approve_course(course_id):
+        return client.put(f'/api/courses/{course_id}/approve', headers=admin)
+
+    def reject_course(course_id):
+        return client.put(f'/api/courses/{course_id}/reject', headers=admin)
+
+    def pending_course(i):
+        course_ids.append(new_pending_course(i))
+        return course_ids[-1]
+
+    def approve_message(message_id):
+        return client.put(f'/api/messages/{message_id}/approve', headers=admin)
+
+    def reject_message(message_id):
+        return client.put(f'/api/messages/{message_id}/reject', headers=admin)
+
+    def pending_message(i):
+        message_ids.append(new_pending_message())
+        return message_ids[-1]
+
+    scenarios = [
+        ('选课成功', unselect, select, 201),
+        ('重复选课', lambda i: APPROVED, select, 409),
+        ('选未批准课程', lambda i: PENDING, select, 400),
+        ('选不存在课程', lambda i: PREFIX + 'NOPE', select, 404),
+        ('退选成功', reselect, deselect, 200),
+        ('退选未选课程', unselect, deselect, 404),
+        ('批准课程', pending_course, approve_course, 200),
+        ('重复批准课程', lambda i: course_ids[i], approve_course, 409),
+        ('拒绝课程', lambda i: pending_course(n + i), reject_course, 200),
+        ('批准留言', pending_message, approve_message, 200),
+        ('重复批准留言', lambda i: message_ids[i], approve_message, 409),
+        ('拒绝留言', pending_message, reject_message, 200),
+    ]
+    try:
+        return [(label, expected, measure(counters, label, n, prepare, request, expected))
+                for label, prepare, request, expected in scenarios]
+    finally:
+        module.close_db_pool()
+        cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='改写前代码的 git 版本')
+    args = parser.parse_args()
+    n = args.rounds
+
+    baseline = load_baseline(args.baseline)
+    counters = ServerCounters()
+    try:
+        before = run_scenarios(baseline, counters, n)
+        after = run_scenarios(app_module, counters, n)
+    finally:
+        counters.close()
+
+    print(f"每个场景执行 {n} 次，每格为 改写前 -> 改写后 (每个请求的平均值)")
+    print(f"{'场景':<14}{'状态码':>6}{'Questions':>16}{'管理命令':>14}{'新建连接':>16}{'耗时(ms)':>18}")
+    for (label, expected, old), (_, _, new) in zip(before, after):
+        print(f"{label:<14}{expected:>6}{old[0]:>7.1f} -> {new[0]:<5.1f}{old[1]:>5.1f} -> {new[1]:<5.1f}"
+              f"{old[2]:>6.2f} -> {new[2]:<6.2f}{old[3]:>7.2f} -> {new[3]:<7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# course-management-app/circuit_breaker.py
+"""数据库访问的熔断器，数据库故障时快速失败，避免请求线程堆积在连接超时上。
+
+状态:
+    closed     正常放行，记录最近 window_size 次调用的成败；
+               至少 min_calls 次调用且失败率 >= failure_rate_threshold 时转为 open
+    open       直接拒绝，持续时间带随机抖动，避免各 worker 同时重连；
+               到期后转为 half_open
+    half_open  只放行一个探测请求：成功则回到 closed，失败则重新 open，
+               且下一次 open 时间加倍 (不超过 max_open_seconds)；
+               探测请求超过 probe_timeout 仍未报告结果 (结果丢失) 时放行下一个探测请求
+"""
+import random
+import threading
+import time
+from collections import deque
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreaker:
+    """线程安全的熔断器 (每个进程一个实例)"""
+
+    def __init__(self, failure_rate_threshold=0.5, window_size=20, min_calls=5,
+                 open_seconds=5.0, max_open_seconds=60.0, jitter=0.2, probe_timeout=30.0):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.jitter = jitter
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._open_until = 0.0
+        self._current_open_seconds = open_seconds
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self.rejections = 0
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh_locked(time.monotonic())
+            return self._state
+
+    def _refresh_locked(self, now):
+        if self._state == OPEN and now >= self._open_until:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        elif self._state == HALF_OPEN and self._probe_in_flight and now - self._probe_started >= self.probe_timeout:
+            self._probe_in_flight = False
+
+    def _open_locked(self, now):
+        duration = self._current_open_seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+        self._state = OPEN
+        self._open_until = now + duration
+        self._probe_in_flight = False
+        self._window.clear()
+        self.times_opened += 1
+
+    def allow(self):
+        """是否放行本次调用；返回 False 时调用方应立即失败"""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh_locked(now)
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+            self.rejections += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._current_open_seconds = self.open_seconds
+                self._window.clear()
+            self._window.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._current_open_seconds = min(self._current_open_seconds * 2, self.max_open_seconds)
+                self._open_locked(now)
+                return
+            if self._state == OPEN:
+                return
+            self._window.append(False)
+            failures = self._window.count(False)
+            if len(self._window) >= self.min_calls and failures / len(self._window) >= self.failure_rate_threshold:
+                self._open_locked(now)
+
+    def retry_after(self):
+        """距离允许下一次探测的秒数 (closed 时为 0)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh_locked(now)
+            return max(0.0, self._open_until - now) if self._state == OPEN else 0.0
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refresh_locked(now)
+            calls = len(self._window)
+            return {
+                'state': self._state,
+                'window_calls': calls,
+                'failure_rate': round(self._window.count(False) / calls, 4) if calls else 0.0,
+                'retry_after': round(max(0.0, self._open_until - now), 2) if self._state == OPEN else 0.0,
+                'times_opened': self.times_opened,
+                'rejections': self.rejections,
+            }
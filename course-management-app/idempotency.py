@@ -0,0 +1,151 @@
+# course-management-app/idempotency.py
+"""按 Idempotency-Key 保存最近的写请求结果，吸收客户端重试和重复点击。
+
+同一个键的重复请求直接返回保存的响应，不再访问数据库；
+并发到达的重复请求等待正在处理的那一个完成后返回同样的结果。
+
+存储为共享内存中的定长槽位哈希表 (开放寻址)，在 fork 之前创建，多进程部署时
+所有 worker 共用：客户端断线重试落到另一个 worker 上也能去重。条目在 ttl_seconds 后过期，
+槽位不足时淘汰探测范围内最早过期的已完成条目。响应体超过 max_body_bytes 时不保存。
+"""
+import hashlib
+import multiprocessing
+import struct
+import time
+from collections import namedtuple
+
+StoredResponse = namedtuple('StoredResponse', ['status_code', 'body', 'mimetype'])
+
+OWNER, REPLAY, MISMATCH, BUSY = 'owner', 'replay', 'mismatch', 'busy'
+
+_EMPTY, _PENDING, _DONE = 0, 1, 2
+# 槽位头部: 键摘要, 请求体摘要, 状态, 过期时间 (monotonic), 状态码, mimetype, 响应体长度
+_HEADER = struct.Struct('<16s16sBdH32sI')
+# 每个键最多探测的槽位数
+_PROBES = 16
+# 等待并发同键请求时的轮询间隔 (秒)
+_POLL_MIN, _POLL_MAX = 0.005, 0.05
+
+
+def _digest(value):
+    return hashlib.blake2b(repr(value).encode('utf-8'), digest_size=16).digest()
+
+
+class IdempotencyStore:
+    """跨进程、线程安全的幂等键存储"""
+
+    def __init__(self, max_entries=10000, ttl_seconds=600, wait_timeout=30, max_body_bytes=1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.wait_timeout = wait_timeout
+        self.max_body_bytes = max_body_bytes
+        self._slot_size = _HEADER.size + max_body_bytes
+        self._buffer = multiprocessing.RawArray('c', max_entries * self._slot_size)
+        self._lock = multiprocessing.Lock()
+        # 以下统计为本进程的计数
+        self.replays = 0
+        self.waits = 0
+        self.conflicts = 0
+
+    def begin(self, key, fingerprint):
+        """登记一次请求，返回 (结果, 已保存的响应)：
+
+        OWNER     由调用方处理请求，之后必须调用 complete() 或 release()
+        REPLAY    已有结果，直接返回保存的响应
+        MISMATCH  同一个键被用于不同的请求体
+        BUSY      等待并发的同键请求超时
+        """
+        key_hash, fingerprint_hash = _digest(key), _digest(fingerprint)
+        deadline = time.monotonic() + self.wait_timeout
+        delay, waited = _POLL_MIN, False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                index, header = self._find_locked(key_hash, now)
+                if header is None:
+                    # 处理中的条目以 wait_timeout 为租期，处理方异常退出后由后来的请求接手
+                    if index is not None:
+                        self._write_header_locked(index, key_hash, fingerprint_hash, _PENDING, now + self.wait_timeout)
+                    return OWNER, None
+                if header[1] != fingerprint_hash:
+                    self.conflicts += 1
+                    return MISMATCH, None
+                if header[2] == _DONE:
+                    self.replays += 1
+                    return REPLAY, self._read_response_locked(index, header)
+                if not waited:
+                    self.waits += 1
+                    waited = True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return BUSY, None
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, _POLL_MAX)
+
+    def complete(self, key, response):
+        """保存请求结果，等待中的重复请求随后取得该结果；响应过大时改为 release()"""
+        mimetype = (response.mimetype or '').encode('utf-8')
+        if len(response.body) > self.max_body_bytes or len(mimetype) > 32:
+            self.release(key)
+            return
+        key_hash = _digest(key)
+        with self._lock:
+            index, header = self._find_locked(key_hash, time.monotonic())
+            if header is None or header[2] != _PENDING:
+                return
+            offset = index * self._slot_size
+            _HEADER.pack_into(self._buffer, offset, key_hash, header[1], _DONE, time.monotonic() + self.ttl_seconds,
+                              response.status_code, mimetype, len(response.body))
+            body_offset = offset + _HEADER.size
+            self._buffer[body_offset:body_offset + len(response.body)] = response.body
+
+    def release(self, key):
+        """放弃该键 (例如服务器错误，允许客户端重试时重新执行)，等待者随后重新竞争处理权"""
+        with self._lock:
+            index, header = self._find_locked(_digest(key), time.monotonic())
+            if header is not None:
+                self._write_header_locked(index, b'', b'', _EMPTY, 0.0)
+
+    def _slot_header_locked(self, index):
+        return _HEADER.unpack_from(self._buffer, index * self._slot_size)
+
+    def _write_header_locked(self, index, key_hash, fingerprint_hash, state, expires_at):
+        _HEADER.pack_into(self._buffer, index * self._slot_size, key_hash, fingerprint_hash, state, expires_at, 0, b'', 0)
+
+    def _read_response_locked(self, index, header):
+        body_offset = index * self._slot_size + _HEADER.size
+        body = self._buffer[body_offset:body_offset + header[6]]
+        return StoredResponse(header[4], body, header[5].rstrip(b'\0').decode('utf-8'))
+
+    def _find_locked(self, key_hash, now):
+        """在探测范围内查找未过期的同键条目，返回 (槽位, 头部)；
+        未找到时返回 (可用槽位, None)，可用槽位依次取空槽/过期槽、最早过期的已完成条目，
+        全部被处理中的条目占用时为 None (此时不登记，该请求不做去重)"""
+        start = int.from_bytes(key_hash[:8], 'little')
+        free, victim, victim_expires = None, None, None
+        for probe in range(_PROBES):
+            index = (start + probe) % self.max_entries
+            header = self._slot_header_locked(index)
+            state, expires_at = header[2], header[3]
+            if state == _EMPTY or expires_at <= now:
+                if free is None:
+                    free = index
+                continue
+            if header[0] == key_hash:
+                return index, header
+            if state == _DONE and (victim is None or expires_at < victim_expires):
+                victim, victim_expires = index, expires_at
+        return (free if free is not None else victim), None
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            entries = sum(1 for index in range(self.max_entries)
+                          if self._slot_header_locked(index)[3] > now)
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'replays': self.replays,
+            'waits': self.waits,
+            'conflicts': self.conflicts,
+        }
@@ -0,0 +1,116 @@
+# course-management-app/response_cache.py
+"""按用户缓存已序列化的 JSON 响应，使用版本号失效，LRU 淘汰。
+
+每个 (命名空间, 用户) 有一个版本号，写路径调用 bump() 使其失效；
+管理员审核这类无法定位到具体用户的写操作调用 bump_all() 使整个命名空间失效。
+读路径须在查询数据库 *之前* 读取版本号并在 put() 时传回，
+这样查询期间发生的写入不会把旧数据以新版本号写入缓存。
+
+版本号保存在共享内存的计数槽中 (按键哈希到固定数量的槽)，在 fork 之前创建，
+多进程部署时一个 worker 的写入也会使其他 worker 的缓存失效；
+哈希冲突只会导致多余的失效，不会返回过期数据。
+"""
+import hashlib
+import multiprocessing
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
+
+CacheEntry = namedtuple('CacheEntry', ['version', 'etag', 'body'])
+
+# 每个条目除响应体外的估算开销 (键、元组、ETag 字符串等)
+_ENTRY_OVERHEAD = 200
+
+
+class ResponseCache:
+    """线程安全的按用户响应缓存，总内存不超过 max_bytes"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, version_slots=65536):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._slots = multiprocessing.RawArray('q', version_slots)
+        self._slots_lock = multiprocessing.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _slot(self, *key):
+        return zlib.crc32(repr(key).encode('utf-8')) % len(self._slots)
+
+    def version(self, namespace, user_id):
+        """返回当前版本号 (命名空间纪元, 用户版本)"""
+        with self._slots_lock:
+            return self._slots[self._slot(namespace)], self._slots[self._slot(namespace, user_id)]
+
+    def _increment(self, slot):
+        with self._slots_lock:
+            self._slots[slot] += 1
+
+    def bump(self, namespace, user_id):
+        """使某个用户在该命名空间下的缓存失效 (对所有 worker 进程生效)"""
+        self._increment(self._slot(namespace, user_id))
+        with self._lock:
+            self._discard_locked((namespace, user_id))
+
+    def bump_all(self, namespace):
+        """使整个命名空间的缓存失效 (旧条目在被访问或淘汰时回收)"""
+        self._increment(self._slot(namespace))
+
+    def get(self, namespace, user_id, version):
+        """命中且版本一致时返回 CacheEntry，否则返回 None"""
+        key = (namespace, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                self._discard_locked(key)
+            self.misses += 1
+            return None
+
+    def put(self, namespace, user_id, version, body):
+        """缓存响应体并返回 CacheEntry；版本已过期或超过容量时只返回条目而不缓存"""
+        entry = CacheEntry(version, hashlib.sha1(body).hexdigest()[:20], body)
+        key = (namespace, user_id)
+        size = len(body) + _ENTRY_OVERHEAD
+        current = self.version(namespace, user_id)
+        with self._lock:
+            if version != current or size > self.max_bytes:
+                return entry
+            self._discard_locked(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_key, old_entry = self._entries.popitem(last=False)
+                self._bytes -= len(old_entry.body) + _ENTRY_OVERHEAD
+                self.evictions += 1
+        return entry
+
+    def _discard_locked(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.body) + _ENTRY_OVERHEAD
+
+    def clear(self):
+        """清空本进程的缓存条目和统计 (fork 之后在每个 worker 中调用)；共享版本号保持不变"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
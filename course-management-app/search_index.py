@@ -0,0 +1,274 @@
+# course-management-app/search_index.py
+"""进程内倒排索引，用于课程目录和已批准留言的全文检索。
+
+中文文本没有空格分词，这里对连续的 CJK 字符生成单字 (unigram) 和双字 (bigram)
+词元；英文/数字按单词切分并转为小写。查询时多个词元取交集 (AND)，
+按字段加权的 TF-IDF 打分排序，最后一个英文词元按前缀匹配。
+
+多进程部署时各 worker 各有一份索引，通过共享内存中的 ChangeLog 互相传递增量修改。
+"""
+import heapq
+import math
+import multiprocessing
+import re
+import struct
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+# CJK 统一表意文字 (含扩展 A) 及兼容表意文字
+_CJK_RANGES = '㐀-䶿一-鿿豈-﫿'
+_TOKEN_RE = re.compile(f'([{_CJK_RANGES}]+)|([a-z0-9]+)')
+
+# 字段权重：课程名命中比教师名、课程号更重要，留言内容为基准
+FIELD_WEIGHTS = {
+    'course_name': 3.0,
+    'teacher_name': 2.0,
+    'course_id': 2.0,
+    'content': 1.0,
+}
+
+DOC_TYPES = ('course', 'message')
+
+
+def _normalize(text):
+    """全角转半角 (NFKC) 并转为小写"""
+    return unicodedata.normalize('NFKC', str(text)).lower()
+
+
+def tokenize(text):
+    """将文本切分为索引词元：CJK 连续片段生成 unigram + bigram，英文数字按单词切分。"""
+    tokens = []
+    if not text:
+        return tokens
+    for cjk, word in _TOKEN_RE.findall(_normalize(text)):
+        if cjk:
+            tokens.extend(cjk)
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def tokenize_query(text):
+    """切分查询串。
+
+    返回 (词元列表, 前缀词元)。CJK 片段长度 >= 2 时只使用 bigram (精度更高)，
+    单个汉字使用 unigram；最后一个英文/数字词元作为前缀词元单独返回。
+    """
+    terms = []
+    prefix = None
+    pieces = _TOKEN_RE.findall(_normalize(text or ''))
+    for i, (cjk, word) in enumerate(pieces):
+        if cjk:
+            if len(cjk) == 1:
+                terms.append(cjk)
+            else:
+                terms.extend(cjk[j:j + 2] for j in range(len(cjk) - 1))
+        elif i == len(pieces) - 1:
+            prefix = word
+        else:
+            terms.append(word)
+    # 去重但保持顺序
+    return list(dict.fromkeys(terms)), prefix
+
+
+class SearchIndex:
+    """线程安全的倒排索引。
+
+    文档以 (doc_type, doc_id) 为键，payload 为返回给前端的原始字段。
+    倒排表结构为 token -> {doc_key: 1 + log(加权词频)}，同时维护一个有序词表用于前缀匹配。
+    """
+
+    def __init__(self, max_prefix_expansions=50):
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._vocab = []
+        self._docs = {}
+        self._doc_tokens = {}
+        self._doc_counts = dict.fromkeys(DOC_TYPES, 0)
+        self.max_prefix_expansions = max_prefix_expansions
+        self.ready = False
+        # 已应用到的 ChangeLog 版本号，由调用方维护 (多进程部署时用于增量同步)
+        self.generation = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    # --- 写入 ---
+    def add(self, doc_type, doc_id, fields, payload):
+        """添加或替换一篇文档。fields 为 {字段名: 文本}，用于建立索引。"""
+        key = (doc_type, str(doc_id))
+        weights = {}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for token in tokenize(text):
+                weights[token] = weights.get(token, 0.0) + weight
+        with self._lock:
+            self._remove_locked(key)
+            for token, weight in weights.items():
+                posting = self._postings.get(token)
+                if posting is None:
+                    posting = self._postings[token] = {}
+                    insort(self._vocab, token)
+                posting[key] = 1.0 + math.log(weight)
+            self._docs[key] = payload
+            self._doc_tokens[key] = tuple(weights)
+            self._doc_counts[doc_type] = self._doc_counts.get(doc_type, 0) + 1
+
+    def remove(self, doc_type, doc_id):
+        """删除一篇文档；文档不存在时忽略。"""
+        with self._lock:
+            self._remove_locked((doc_type, str(doc_id)))
+
+    def _remove_locked(self, key):
+        tokens = self._doc_tokens.pop(key, None)
+        if tokens is None:
+            return
+        del self._docs[key]
+        self._doc_counts[key[0]] -= 1
+        for token in tokens:
+            posting = self._postings[token]
+            posting.pop(key, None)
+            if not posting:
+                del self._postings[token]
+                idx = bisect_left(self._vocab, token)
+                if idx < len(self._vocab) and self._vocab[idx] == token:
+                    del self._vocab[idx]
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._vocab.clear()
+            self._docs.clear()
+            self._doc_tokens.clear()
+            self._doc_counts = dict.fromkeys(DOC_TYPES, 0)
+            self.ready = False
+
+    # --- 查询 ---
+    def _expand_prefix_locked(self, prefix):
+        """返回词表中以 prefix 开头的词元 (最多 max_prefix_expansions 个)"""
+        idx = bisect_left(self._vocab, prefix)
+        matches = []
+        while idx < len(self._vocab) and self._vocab[idx].startswith(prefix):
+            matches.append(self._vocab[idx])
+            if len(matches) >= self.max_prefix_expansions:
+                break
+            idx += 1
+        return matches
+
+    def _idf_locked(self, token):
+        n = len(self._docs)
+        df = len(self._postings.get(token, ()))
+        return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query, doc_type=None, page=1, page_size=20):
+        """执行检索，返回 (总命中数, 当前页结果列表)。
+
+        每条结果为 payload 的浅拷贝，附加 type 与 score 字段。
+        """
+        terms, prefix = tokenize_query(query)
+        if not terms and not prefix:
+            return 0, []
+        with self._lock:
+            # 每个查询词元对应一组 (idf, {doc_key: tf})，文档须命中全部词元
+            groups = []
+            for token in terms:
+                posting = self._postings.get(token)
+                if not posting:
+                    return 0, []
+                groups.append((self._idf_locked(token), posting))
+            if prefix:
+                merged = {}
+                for token in self._expand_prefix_locked(prefix):
+                    # 完整单词命中比前缀命中得分更高
+                    idf = self._idf_locked(token) * (1.0 if token == prefix else 0.5)
+                    for key, tf in self._postings[token].items():
+                        score = idf * tf
+                        if score > merged.get(key, 0.0):
+                            merged[key] = score
+                if not merged:
+                    return 0, []
+                groups.append((1.0, merged))
+
+            # 从最短的倒排表出发求交集
+            groups.sort(key=lambda group: len(group[1]))
+            idf, smallest = groups[0]
+            rest = groups[1:]
+            scores = {}
+            for key, tf in smallest.items():
+                if doc_type and key[0] != doc_type:
+                    continue
+                score = idf * tf
+                for other_idf, other in rest:
+                    other_tf = other.get(key)
+                    if other_tf is None:
+                        break
+                    score += other_idf * other_tf
+                else:
+                    scores[key] = score
+
+            start = (page - 1) * page_size
+            ranked = heapq.nsmallest(start + page_size, scores.items(), key=lambda item: (-item[1], item[0]))
+            results = []
+            for key, score in ranked[start:]:
+                item = dict(self._docs[key])
+                item['type'] = key[0]
+                item['score'] = round(score, 4)
+                results.append(item)
+            return len(scores), results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'documents': dict(self._doc_counts),
+                'tokens': len(self._postings),
+            }
+
+
+class ChangeLog:
+    """跨进程共享的索引变更日志：环形缓冲区，在 fork 之前创建，位于共享内存中。
+
+    每条记录为 (操作, 文档类型, 文档 ID)，记录序号即数据版本号。某个 worker 修改索引后
+    append() 一条记录；其他 worker 用 since() 取回自己尚未应用的记录增量更新，
+    落后超过缓冲区容量 (或遇到无法记录的变更) 时 since() 返回 None，调用方须全量重建。
+    """
+
+    ADD, REMOVE, RESET = 1, 2, 3
+    _RECORD = struct.Struct('<BB62s')
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self._records = multiprocessing.RawArray('c', capacity * self._RECORD.size)
+        self._generation = multiprocessing.Value('q', 0)
+
+    @property
+    def generation(self):
+        return self._generation.value
+
+    def append(self, op, doc_type, doc_id):
+        """追加一条变更，返回追加后的版本号 (即该记录的序号 + 1)"""
+        encoded = str(doc_id).encode('utf-8')
+        if len(encoded) > 62:
+            op, encoded = self.RESET, b''
+        with self._generation.get_lock():
+            generation = self._generation.value
+            offset = (generation % self.capacity) * self._RECORD.size
+            self._RECORD.pack_into(self._records, offset, op, DOC_TYPES.index(doc_type), encoded)
+            self._generation.value = generation + 1
+            return generation + 1
+
+    def since(self, generation):
+        """返回 (当前版本号, [(操作, 文档类型, 文档 ID 字符串), ...])；无法增量更新时列表为 None"""
+        with self._generation.get_lock():
+            current = self._generation.value
+            if current - generation > self.capacity:
+                return current, None
+            changes = []
+            for seq in range(generation, current):
+                op, type_index, encoded = self._RECORD.unpack_from(self._records, (seq % self.capacity) * self._RECORD.size)
+                if op == self.RESET:
+                    return current, None
+                changes.append((op, DOC_TYPES[type_index], encoded.rstrip(b'\0').decode('utf-8')))
+            return current, changes
@@ -0,0 +1,100 @@
+# course-management-app/serve.py
+"""生产环境启动入口 (基于 gunicorn，仅支持 Linux/macOS)。
+
+master 进程预加载应用并构建检索索引，随后 fork 出 worker 进程；索引等只读数据
+通过写时复制在 worker 间共享。每个 worker 在 fork 之后创建自己的数据库连接池。
+
+信号:
+    SIGHUP   重建检索索引并平滑重启所有 worker (旧 worker 处理完当前请求后退出)
+    SIGTERM  停止接受新连接，等待进行中的请求完成 (最长 graceful-timeout 秒) 后退出
+    SIGINT / SIGQUIT  立即退出
+
+用法: python serve.py [--workers 4] [--threads 4] [--bind 0.0.0.0:5000]
+未指定的参数从环境变量 WEB_WORKERS / WEB_THREADS / PORT / GRACEFUL_TIMEOUT 读取。
+"""
+import argparse
+import os
+
+from dotenv import load_dotenv
+from gunicorn.app.base import BaseApplication
+
+load_dotenv()
+
+
+def default_workers():
+    # gunicorn 推荐 2 * CPU + 1；每个 worker 有独立的连接池，这里设上限以免耗尽 MySQL 连接数
+    return min((os.cpu_count() or 1) * 2 + 1, 8)
+
+
+def post_fork(server, worker):
+    import app as app_module
+    app_module.init_worker()
+
+
+def worker_exit(server, worker):
+    import app as app_module
+    app_module.close_db_pool()
+
+
+def on_reload(server):
+    # SIGHUP: 在 master 中重建索引，新 fork 的 worker 直接继承最新数据
+    import app as app_module
+    app_module.build_search_index()
+    app_module.close_db_pool()
+
+
+class CourseApplication(BaseApplication):
+    """以编程方式配置的 gunicorn 应用，preload_app 使应用在 fork 之前只加载一次"""
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        import app as app_module
+        app_module.build_search_index()
+        # master 不处理请求，fork 之前关闭其连接，避免 worker 继承打开的 socket
+        app_module.close_db_pool()
+        return app_module.app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='课程管理系统生产环境启动入口')
+    parser.add_argument('--bind', default=f"0.0.0.0:{os.getenv('PORT', 5000)}")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_WORKERS', default_workers())),
+                        help='worker 进程数 (设为 1 即单进程多线程)')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', 4)),
+                        help='每个 worker 的线程数')
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.getenv('GRACEFUL_TIMEOUT', 30)),
+                        help='SIGTERM / SIGHUP 时等待进行中请求完成的秒数')
+    parser.add_argument('--timeout', type=int, default=int(os.getenv('WORKER_TIMEOUT', 60)),
+                        help='worker 无响应多少秒后被重启')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'graceful_timeout': args.graceful_timeout,
+        'timeout': args.timeout,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+        'on_reload': on_reload,
+        'accesslog': '-',
+    }
+    # 默认每个 worker 的连接池大小与线程数一致
+    os.environ.setdefault('DB_POOL_SIZE', str(args.threads))
+    CourseApplication(options).run()
+
+
+if __name__ == '__main__':
+    main()
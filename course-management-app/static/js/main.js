@@ -1,7 +1,41 @@
 // static/js/main.js
 
+// 生成一次用户操作的幂等键，重试时复用同一个键，服务器只执行一次
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
+// 同一操作 (接口 + 请求体) 在最近一次点击后的一段时间内复用同一个幂等键，
+// 双击或重复提交时两次请求带同一个键，服务器只执行一次
+const IDEMPOTENCY_KEY_REUSE_MS = 10000;
+const recentIdempotencyKeys = new Map();
+
+function idempotencyKeyFor(endpoint, body = null) {
+    const action = `${endpoint} ${body ? JSON.stringify(body) : ''}`;
+    const now = Date.now();
+    for (const [recentAction, entry] of recentIdempotencyKeys) {
+        if (entry.expires <= now) recentIdempotencyKeys.delete(recentAction);
+    }
+    let entry = recentIdempotencyKeys.get(action);
+    if (!entry) {
+        entry = { key: newIdempotencyKey() };
+        recentIdempotencyKeys.set(action, entry);
+    }
+    entry.expires = now + IDEMPOTENCY_KEY_REUSE_MS;
+    return entry.key;
+}
+
+// 反向操作 (如退选) 成功后调用，之后再次执行原操作时使用新的键
+function forgetIdempotencyKey(endpoint, body = null) {
+    recentIdempotencyKeys.delete(`${endpoint} ${body ? JSON.stringify(body) : ''}`);
+}
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
 // 假设 fetchApi 函数定义在 api.js 或此文件上方
-async function fetchApi(endpoint, method = 'GET', body = null) {
+// 传入 idempotencyKey 时，网络错误或 503 会按 Retry-After 用同一个键重试
+async function fetchApi(endpoint, method = 'GET', body = null, idempotencyKey = null) {
     const API_BASE_URL = ''; // 通常为空字符串
     const url = `${API_BASE_URL}${endpoint}`;
     const token = localStorage.getItem('authToken');
@@ -12,6 +46,9 @@ async function fetchApi(endpoint, method = 'GET', body = null) {
     if (token) {
         headers['Authorization'] = `Bearer ${token}`;
     }
+    if (idempotencyKey) {
+        headers['Idempotency-Key'] = idempotencyKey;
+    }
 
     const config = {
         method: method.toUpperCase(),
@@ -22,8 +59,21 @@ async function fetchApi(endpoint, method = 'GET', body = null) {
         config.body = JSON.stringify(body);
     }
 
+    const maxAttempts = idempotencyKey ? 3 : 1;
     try {
-        const response = await fetch(url, config);
+        let response;
+        for (let attempt = 1; ; attempt++) {
+            try {
+                response = await fetch(url, config);
+            } catch (networkError) {
+                if (attempt >= maxAttempts) throw networkError;
+                await sleep(1000 * attempt);
+                continue;
+            }
+            if (response.status !== 503 || attempt >= maxAttempts) break;
+            const retryAfter = parseInt(response.headers.get('Retry-After'), 10);
+            await sleep(Math.min(Number.isNaN(retryAfter) ? attempt : retryAfter, 5) * 1000);
+        }
         let data;
         try {
             const text = await response.text();
@@ -191,7 +241,7 @@ async function handleUploadCourseSubmit(event) {
     if (!courseData.course_id || !courseData.course_name) { messageElement.textContent = '课程号和课程名不能为空'; messageElement.className = 'message error-message'; return; }
     if ((courseData.hours !== null && courseData.hours < 0) || (courseData.credits !== null && courseData.credits < 0)) { messageElement.textContent = '学时和学分不能为负数'; messageElement.className = 'message error-message'; return; }
     try {
-        const result = await fetchApi('/api/courses', 'POST', courseData);
+        const result = await fetchApi('/api/courses', 'POST', courseData, idempotencyKeyFor('/api/courses', courseData));
         messageElement.textContent = result.message || '上传成功，等待审批！'; messageElement.className = 'message success-message'; event.target.reset();
      } catch (error) {
         console.error("上传课程失败:", error); messageElement.textContent = `上传失败: ${error.message}`; messageElement.className = 'message error-message';
@@ -263,7 +313,7 @@ async function handleSelectCourse(event) {
     const button = event.target; const courseId = button.dataset.courseId; if (!courseId) return;
     button.disabled = true; button.textContent = '处理中...';
     try {
-        const result = await fetchApi(`/api/courses/${courseId}/select`, 'POST');
+        const result = await fetchApi(`/api/courses/${courseId}/select`, 'POST', null, idempotencyKeyFor(`/api/courses/${courseId}/select`));
         alert(result.message || '选课成功！'); button.textContent = '已选';
     } catch (error) {
         console.error("选课失败:", error); alert(`选课失败: ${error.message}`); button.disabled = false; button.textContent = '选课';
@@ -345,6 +395,7 @@ async function handleDeselectCourse(event) {
     button.disabled = true; button.textContent = '处理中...';
     try {
         const result = await fetchApi(`/api/selections/${courseId}`, 'DELETE'); alert(result.message || '退选成功！');
+        forgetIdempotencyKey(`/api/courses/${courseId}/select`);
         const rowToRemove = document.getElementById(`selection-row-${courseId}`); if (rowToRemove) rowToRemove.remove();
         updatePendingCount('my-selections-container', '门课程'); // 更新统计
     } catch (error) {
@@ -388,7 +439,7 @@ async function handleSubmitMessage(event) {
     const content = contentTextArea.value.trim(); if (!content) { feedbackElement.textContent = '留言内容不能为空'; feedbackElement.className = 'message error-message'; return; }
     feedbackElement.textContent = '正在提交...'; feedbackElement.className = 'message'; const submitButton = event.target.querySelector('button[type="submit"]'); if(submitButton) submitButton.disabled = true;
     try {
-        const result = await fetchApi('/api/messages', 'POST', { content: content });
+        const result = await fetchApi('/api/messages', 'POST', { content: content }, idempotencyKeyFor('/api/messages', { content: content }));
         feedbackElement.textContent = result.message || '提交成功！'; feedbackElement.className = 'message success-message'; contentTextArea.value = '';
         // 延迟一小段时间再重新加载，确保后端处理完毕
         setTimeout(() => loadStudentMessagesView(document.getElementById('main-content')), 500);
@@ -0,0 +1,198 @@
+# course-management-app/tests/test_db_outage.py
+"""数据库故障时请求延迟有上界：熔断器打开前每个请求最多等一次超时，打开后立即返回 503。
+
+无需真实数据库：连接故障用一个只接受连接、从不发送握手包的本地 "黑洞" 端口模拟；
+数据库可连接但响应缓慢用一个执行语句时等满读超时后报错的假驱动模拟。
+
+用法: python -m pytest tests/test_db_outage.py
+"""
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('JWT_SECRET', 'test-secret')
+import jwt  # noqa: E402
+import mysql.connector  # noqa: E402
+import app as app_module  # noqa: E402
+from circuit_breaker import CircuitBreaker  # noqa: E402
+
+CONNECT_TIMEOUT = 1
+READ_TIMEOUT = 0.5
+# 线程调度和 Flask 处理本身的余量
+SLACK = 0.5
+REQUESTS, CONCURRENCY = 60, 8
+
+
+@pytest.fixture
+def blackhole_port():
+    """监听一个本地端口，接受连接但从不响应"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(128)
+    held = []
+
+    def accept_forever():
+        while True:
+            try:
+                held.append(server.accept()[0])
+            except OSError:
+                return
+
+    threading.Thread(target=accept_forever, daemon=True).start()
+    yield server.getsockname()[1]
+    server.close()
+    for conn in held:
+        conn.close()
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(open_seconds=30)
+    monkeypatch.setattr(app_module, 'db_breaker', breaker)
+    app_module.init_db_pool()
+    yield breaker
+    app_module.close_db_pool()
+
+
+def auth_headers():
+    payload = {'id': 'test', 'name': 'test', 'role': 'student', 'exp': datetime.now(timezone.utc) + timedelta(hours=1)}
+    return {'Authorization': 'Bearer ' + jwt.encode(payload, app_module.app.config['SECRET_KEY'], algorithm='HS256')}
+
+
+def run_requests():
+    """并发请求课程列表，返回 [(延迟秒数, 状态码, Retry-After), ...]"""
+    client = app_module.app.test_client()
+    headers = auth_headers()
+
+    def one(_):
+        start = time.perf_counter()
+        response = client.get('/api/courses', headers=headers)
+        return time.perf_counter() - start, response.status_code, response.headers.get('Retry-After')
+
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        return list(pool.map(one, range(REQUESTS)))
+
+
+def p95(results):
+    latencies = sorted(r[0] for r in results)
+    return latencies[int(len(latencies) * 0.95) - 1]
+
+
+def test_unreachable_database_latency_is_bounded(monkeypatch, blackhole_port, breaker):
+    monkeypatch.setenv('DB_HOST', '127.0.0.1')
+    monkeypatch.setenv('DB_PORT', str(blackhole_port))
+    monkeypatch.setenv('DB_CONNECT_TIMEOUT', str(CONNECT_TIMEOUT))
+
+    results = run_requests()
+
+    assert p95(results) <= CONNECT_TIMEOUT + SLACK
+    assert max(r[0] for r in results) <= CONNECT_TIMEOUT + SLACK
+    assert all(status == 503 for _, status, _ in results)
+    assert breaker.stats()['state'] == 'open'
+    # 熔断后的请求不再尝试连接，且告知客户端何时重试
+    rejected = [r for r in results if r[0] < 0.1]
+    assert len(rejected) >= REQUESTS - 2 * CONCURRENCY
+    assert all(retry_after for _, _, retry_after in rejected)
+
+
+class SlowCursor:
+    """每条语句都等满读超时后报连接丢失，模拟可连接但无响应的 MySQL"""
+
+    def execute(self, *args, **kwargs):
+        time.sleep(READ_TIMEOUT)
+        raise mysql.connector.OperationalError(msg='Lost connection to MySQL server during query', errno=2013)
+
+    def close(self):
+        pass
+
+
+class SlowConnection:
+    unread_result = False
+
+    def cursor(self, *args, **kwargs):
+        return SlowCursor()
+
+    def close(self):
+        pass
+
+
+def test_slow_database_opens_breaker(monkeypatch, breaker):
+    monkeypatch.setattr(mysql.connector, 'connect', lambda **kwargs: SlowConnection())
+
+    results = run_requests()
+
+    assert p95(results) <= READ_TIMEOUT + SLACK
+    assert breaker.stats()['state'] == 'open'
+    statuses = [status for _, status, _ in results]
+    # 超时的请求返回 500，熔断器打开后其余请求立即返回 503
+    assert statuses.count(500) <= 2 * CONCURRENCY
+    assert statuses.count(503) >= REQUESTS - 2 * CONCURRENCY
+
+
+class DeadConnection:
+    """与驱动一样在 cursor() 中 ping 失败 (数据库已重启或仍不可用)"""
+    unread_result = False
+
+    def cursor(self, *args, **kwargs):
+        raise mysql.connector.OperationalError(msg='MySQL Connection not available.')
+
+    def close(self):
+        pass
+
+
+class HealthyConnection(DeadConnection):
+    def cursor(self, *args, **kwargs):
+        return HealthyCursor()
+
+
+class HealthyCursor:
+    def execute(self, *args, **kwargs):
+        pass
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+def test_probe_dying_in_cursor_reopens_breaker(monkeypatch):
+    breaker = CircuitBreaker(min_calls=1, open_seconds=0.05, jitter=0)
+    monkeypatch.setattr(app_module, 'db_breaker', breaker)
+    app_module.init_db_pool()
+    app_module._idle_connections.append(app_module.PooledConnection(DeadConnection()))
+    monkeypatch.setattr(mysql.connector, 'connect', lambda **kwargs: DeadConnection())
+    client = app_module.app.test_client()
+    breaker.record_failure()
+    time.sleep(0.1)
+    assert client.get('/api/health').status_code == 503  # half_open 也算降级
+
+    # 探测请求在 cursor() 中失败：计为失败并重新打开，而不是一直停在 half_open
+    response = client.get('/api/courses', headers=auth_headers())
+    assert response.status_code == 503
+    assert breaker.stats()['state'] == 'open'
+
+    # 数据库恢复后下一次探测成功，熔断器闭合
+    monkeypatch.setattr(mysql.connector, 'connect', lambda **kwargs: HealthyConnection())
+    time.sleep(0.15)
+    assert client.get('/api/courses', headers=auth_headers()).status_code == 200
+    assert breaker.stats()['state'] == 'closed'
+    assert client.get('/api/health').status_code == 200
+    app_module.close_db_pool()
+
+
+def test_lost_probe_outcome_expires():
+    breaker = CircuitBreaker(min_calls=1, open_seconds=0.01, jitter=0, probe_timeout=0.1)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()  # 探测请求放行后没有报告结果
+    assert not breaker.allow()
+    time.sleep(0.1)
+    assert breaker.allow()
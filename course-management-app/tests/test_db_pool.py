@@ -0,0 +1,113 @@
+# course-management-app/tests/test_db_pool.py
+"""空闲连接栈：数据库重启后失效的空闲连接在 cursor() 时被替换，不会变成用户可见的 500。
+
+用法: python -m pytest tests/test_db_pool.py
+"""
+import os
+import sys
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('JWT_SECRET', 'test-secret')
+import jwt  # noqa: E402
+import mysql.connector  # noqa: E402
+import app as app_module  # noqa: E402
+from circuit_breaker import CircuitBreaker  # noqa: E402
+
+
+class FakeCursor:
+    rowcount = 0
+
+    def execute(self, *args, **kwargs):
+        pass
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """alive=False 时 cursor() 与驱动一样 ping 失败并抛出 OperationalError"""
+    unread_result = False
+
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.closed = False
+
+    def cursor(self, *args, **kwargs):
+        if not self.alive:
+            raise mysql.connector.OperationalError(msg='MySQL Connection not available.')
+        return FakeCursor()
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker()
+    monkeypatch.setattr(app_module, 'db_breaker', breaker)
+    app_module.init_db_pool()
+    yield breaker
+    app_module.close_db_pool()
+
+
+@pytest.fixture
+def get_courses():
+    client = app_module.app.test_client()
+    payload = {'id': 'test', 'name': 'test', 'role': 'student', 'exp': datetime.now(timezone.utc) + timedelta(hours=1)}
+    headers = {'Authorization': 'Bearer ' + jwt.encode(payload, app_module.app.config['SECRET_KEY'], algorithm='HS256')}
+    return lambda: client.get('/api/courses', headers=headers)
+
+
+def idle(*conns):
+    """把连接放入空闲栈，模拟数据库重启前建立的连接"""
+    for conn in conns:
+        app_module._idle_connections.append(app_module.PooledConnection(conn))
+
+
+def test_stale_idle_connections_are_replaced(monkeypatch, breaker, get_courses):
+    stale = [FakeConnection(alive=False) for _ in range(3)]
+    idle(*stale)
+    fresh = []
+    monkeypatch.setattr(mysql.connector, 'connect', lambda **kwargs: fresh.append(FakeConnection()) or fresh[-1])
+
+    response = get_courses()
+
+    assert response.status_code == 200
+    # 第一个失效连接换成新连接后，其余空闲连接一并丢弃
+    assert all(conn.closed for conn in stale)
+    assert len(fresh) == 1 and list(app_module._idle_connections)[0]._conn is fresh[0]
+    assert breaker.stats()['window_calls'] == 1 and breaker.stats()['failure_rate'] == 0.0
+    assert get_courses().status_code == 200
+    assert len(fresh) == 1
+
+
+def test_cursor_failure_after_retry_is_503(monkeypatch, breaker, get_courses):
+    idle(FakeConnection(alive=False))
+    monkeypatch.setattr(mysql.connector, 'connect', lambda **kwargs: FakeConnection(alive=False))
+
+    response = get_courses()
+
+    assert response.status_code == 503
+    assert response.get_json() == {"message": "数据库服务暂时不可用"}
+    assert breaker.stats()['failure_rate'] == 1.0
+    assert not app_module._idle_connections
+
+
+def test_connect_failure_flushes_idle_connections(monkeypatch, breaker):
+    stale = FakeConnection()
+    idle(stale)
+    # 模拟并发：本线程建连时其他线程刚把连接放回空闲栈
+    monkeypatch.setattr(app_module, '_checkout_idle_connection', lambda: None)
+
+    def refuse(**kwargs):
+        raise mysql.connector.InterfaceError(msg="Can't connect to MySQL server", errno=2003)
+    monkeypatch.setattr(mysql.connector, 'connect', refuse)
+
+    assert app_module.get_db_connection() is None
+    assert not app_module._idle_connections and stale.closed
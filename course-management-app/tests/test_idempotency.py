@@ -0,0 +1,44 @@
+# course-management-app/tests/test_idempotency.py
+"""幂等键存储在 fork 出的 worker 进程之间共享：重试落到另一个进程上也只执行一次。
+
+用法: python -m pytest tests/test_idempotency.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import idempotency  # noqa: E402
+from idempotency import IdempotencyStore, StoredResponse  # noqa: E402
+
+KEY = ('S001', 'POST', '/api/messages', 'retry-key')
+RESPONSE = StoredResponse(201, '{"message": "留言提交成功"}'.encode('utf-8'), 'application/json')
+
+
+def test_duplicate_in_other_process_waits_and_replays():
+    store = IdempotencyStore(max_entries=64, wait_timeout=5)
+    ready_r, ready_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # 子进程模拟首次请求所在的 worker：登记后处理一段时间再保存结果
+        store.begin(KEY, 'body')
+        os.write(ready_w, b'1')
+        time.sleep(0.2)
+        store.complete(KEY, RESPONSE)
+        os._exit(0)
+    os.read(ready_r, 1)
+    outcome, stored = store.begin(KEY, 'body')
+    os.waitpid(pid, 0)
+    assert outcome == idempotency.REPLAY
+    assert stored == RESPONSE
+    assert store.begin(KEY, 'other body')[0] == idempotency.MISMATCH
+
+
+def test_busy_until_released():
+    store = IdempotencyStore(max_entries=64, wait_timeout=5)
+    assert store.begin(KEY, 'body')[0] == idempotency.OWNER
+    # 首次请求仍在处理 (租期为登记时的 5 秒)，重复请求等待 0.1 秒后放弃
+    store.wait_timeout = 0.1
+    assert store.begin(KEY, 'body')[0] == idempotency.BUSY
+    store.release(KEY)
+    assert store.begin(KEY, 'body')[0] == idempotency.OWNER
@@ -0,0 +1,127 @@
+# course-management-app/tests/test_response_cache.py
+"""按用户的响应缓存：查询期间发生写入时不缓存旧数据、按 max_bytes 做 LRU 淘汰、
+If-None-Match 返回 304，以及通过共享版本号跨进程失效。
+
+用法: python -m pytest tests/test_response_cache.py
+"""
+import os
+import sys
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('JWT_SECRET', 'test-secret')
+import jwt  # noqa: E402
+import mysql.connector  # noqa: E402
+import app as app_module  # noqa: E402
+from response_cache import ResponseCache, _ENTRY_OVERHEAD  # noqa: E402
+
+
+def test_write_during_query_is_not_cached():
+    cache = ResponseCache()
+    version = cache.version('selections', 'S1')  # 读路径在查询数据库之前取版本号
+    cache.bump('selections', 'S1')  # 查询期间发生写入
+    cache.put('selections', 'S1', version, b'[old]')
+    assert cache.get('selections', 'S1', cache.version('selections', 'S1')) is None
+
+    version = cache.version('selections', 'S1')
+    cache.put('selections', 'S1', version, b'[new]')
+    assert cache.get('selections', 'S1', version).body == b'[new]'
+    cache.bump_all('selections')  # 审核类写操作使整个命名空间失效
+    assert cache.get('selections', 'S1', cache.version('selections', 'S1')) is None
+
+
+def test_lru_eviction_at_max_bytes():
+    body = b'x' * 100
+    cache = ResponseCache(max_bytes=3 * (len(body) + _ENTRY_OVERHEAD))
+    versions = {}
+    for user in ('A', 'B', 'C'):
+        versions[user] = cache.version('messages', user)
+        cache.put('messages', user, versions[user], body)
+    assert cache.get('messages', 'A', versions['A'])  # A 变为最近使用
+    versions['D'] = cache.version('messages', 'D')
+    cache.put('messages', 'D', versions['D'], body)
+
+    assert cache.get('messages', 'B', versions['B']) is None
+    assert all(cache.get('messages', user, versions[user]) for user in ('A', 'C', 'D'))
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['bytes'] <= stats['max_bytes']
+    # 单个超过容量的响应不缓存
+    cache.put('messages', 'E', cache.version('messages', 'E'), b'x' * cache.max_bytes)
+    assert cache.get('messages', 'E', cache.version('messages', 'E')) is None
+
+
+def test_bump_in_other_process_invalidates():
+    cache = ResponseCache()
+    version = cache.version('selections', 'S1')
+    cache.put('selections', 'S1', version, b'[]')
+    pid = os.fork()
+    if pid == 0:
+        cache.bump('selections', 'S1')
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert cache.version('selections', 'S1') != version
+    assert cache.get('selections', 'S1', cache.version('selections', 'S1')) is None
+
+
+# --- 经由路由的 ETag / 304 与写路径失效 ---
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+
+    def execute(self, sql, params=()):
+        self.db['queries'] += 1
+        if sql.startswith('DELETE'):
+            self.rowcount = 1
+
+    def fetchall(self):
+        return [{'course_id': 'C1', 'course_name': '操作系统', 'hours': 32, 'credits': 2, 'teacher_name': '李明',
+                 'selection_time': None, 'grade': None}]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    unread_result = False
+
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self.db)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    db = {'queries': 0}
+    monkeypatch.setattr(mysql.connector, 'connect', lambda **kwargs: FakeConnection(db))
+    app_module.init_db_pool()
+    app_module.response_cache.clear()
+    payload = {'id': 'S304', 'name': 'test', 'role': 'student', 'exp': datetime.now(timezone.utc) + timedelta(hours=1)}
+    headers = {'Authorization': 'Bearer ' + jwt.encode(payload, app_module.app.config['SECRET_KEY'], algorithm='HS256')}
+    yield app_module.app.test_client(), headers, db
+    app_module.close_db_pool()
+
+
+def test_if_none_match_returns_304_until_write(client):
+    client, headers, db = client
+    first = client.get('/api/selections/my', headers=headers)
+    assert first.status_code == 200 and first.headers['X-Cache'] == 'MISS'
+    etag = first.headers['ETag']
+
+    second = client.get('/api/selections/my', headers=dict(headers, **{'If-None-Match': etag}))
+    assert second.status_code == 304 and second.headers['X-Cache'] == 'HIT'
+    assert not second.get_data()
+    assert db['queries'] == 1
+
+    assert client.delete('/api/selections/C1', headers=headers).status_code == 200
+    third = client.get('/api/selections/my', headers=dict(headers, **{'If-None-Match': etag}))
+    # 退选后缓存失效，重新查询；本例数据未变，ETag 相同仍返回 304
+    assert third.status_code == 304 and third.headers['X-Cache'] == 'MISS'
+    assert db['queries'] == 3
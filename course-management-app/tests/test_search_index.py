@@ -0,0 +1,158 @@
+# course-management-app/tests/test_search_index.py
+"""倒排索引的分词、AND 语义、分页，以及多 worker 之间通过 ChangeLog 增量同步。
+
+用法: python -m pytest tests/test_search_index.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('JWT_SECRET', 'test-secret')
+import mysql.connector  # noqa: E402
+import app as app_module  # noqa: E402
+from search_index import SearchIndex, ChangeLog, tokenize, tokenize_query  # noqa: E402
+
+
+def course(course_id, name, teacher):
+    return {'course_id': course_id, 'course_name': name, 'teacher_name': teacher}
+
+
+def make_index(*courses):
+    index = SearchIndex()
+    for row in courses:
+        index.add('course', row['course_id'], row, row)
+    return index
+
+
+def ids(results):
+    return [item['course_id'] for item in results]
+
+
+def test_tokenize_cjk_bigrams_and_words():
+    assert tokenize('数据库Ｐｙｔｈｏｎ3') == ['数', '据', '库', '数据', '据库', 'python3']
+    # 查询只用 bigram，最后一个英文词元作为前缀
+    assert tokenize_query('数据库 原理 pyth') == (['数据', '据库', '原理'], 'pyth')
+    assert tokenize_query('王') == (['王'], None)
+
+
+def test_mixed_chinese_latin_name():
+    index = make_index(course('C1', 'Python程序设计', '王伟'),
+                       course('C2', 'Java程序设计', '李娜'),
+                       course('C3', 'Python数据分析', '张敏'))
+    assert ids(index.search('python程序')[1]) == ['C1']
+    # 最后一个英文词元按前缀匹配，中文词与之取 AND
+    assert ids(index.search('程序 pyth')[1]) == ['C1']
+    assert sorted(ids(index.search('PYTHON')[1])) == ['C1', 'C3']
+    assert index.search('python 网络') == (0, [])
+
+
+def test_page_two():
+    index = make_index(*(course(f'C{i:02d}', f'数据库原理{i}', '王伟') for i in range(25)))
+    total, page1 = index.search('数据库', page=1, page_size=10)
+    _, page2 = index.search('数据库', page=2, page_size=10)
+    _, page3 = index.search('数据库', page=3, page_size=10)
+    assert total == 25
+    assert len(page1) == 10 and len(page2) == 10 and len(page3) == 5
+    assert not set(ids(page1)) & set(ids(page2))
+    assert set(ids(page1 + page2 + page3)) == {f'C{i:02d}' for i in range(25)}
+
+
+def test_change_log_since_and_wraparound():
+    log = ChangeLog(capacity=4)
+    for i in range(6):
+        log.append(ChangeLog.ADD, 'message', i)
+    # 版本 1 之后有 5 条变更，超过容量，只能全量重建
+    assert log.since(1) == (6, None)
+    assert log.since(2) == (6, [(ChangeLog.ADD, 'message', str(i)) for i in range(2, 6)])
+    log.append(ChangeLog.REMOVE, 'course', 'X' * 100)  # 超长 ID 无法记录
+    assert log.since(6) == (7, None)
+
+
+# --- 多 worker 增量同步 (假驱动，按查询返回数据库中的已批准数据) ---
+class FakeDatabase:
+    def __init__(self):
+        self.courses = {'C1': course('C1', '操作系统', '李明')}
+        self.messages = {}
+        self.queries = []
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        self.db.queries.append((sql, list(params)))
+        table = self.db.courses if 'FROM courses' in sql else self.db.messages
+        keys = params if 'IN (' in sql else list(table)
+        self.rows = [dict(table[key], hours=32, credits=2, post_date=None) for key in keys if key in table]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    unread_result = False
+
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self.db)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(mysql.connector, 'connect', lambda **kwargs: FakeConnection(db))
+    app_module.init_db_pool()
+    assert app_module.build_search_index()
+    db.queries.clear()
+    yield db
+    app_module.close_db_pool()
+
+
+def other_worker(op, doc_type, doc_id):
+    """在 fork 出的子进程中记录一条变更，模拟另一个 worker 的审批操作"""
+    pid = os.fork()
+    if pid == 0:
+        app_module._search_changes.append(op, doc_type, doc_id)
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+
+def test_add_from_other_worker_reaches_index_through_backlog(db):
+    db.courses['C2'] = course('C2', '数据库原理', '王伟')
+    other_worker(ChangeLog.ADD, 'course', 'C2')
+
+    assert app_module._sync_search_index()
+    assert app_module._search_backlog['course'] == {'C2'}
+    assert not db.queries  # 同步本身不查询数据库，也没有全量重建
+    assert app_module._flush_search_backlog()
+
+    assert [params for _, params in db.queries] == [['C2']]
+    assert ids(app_module.search_index.search('数据库')[1]) == ['C2']
+    assert app_module.search_index.generation == app_module._search_changes.generation
+
+
+def test_remove_from_other_worker_drops_queued_backlog_id(db):
+    db.messages[7] = {'message_id': 7, 'content': '数据库很好'}
+    app_module._queue_search_doc('message', 7)
+    other_worker(ChangeLog.REMOVE, 'message', 7)
+    other_worker(ChangeLog.REMOVE, 'course', 'C1')
+
+    assert app_module._sync_search_index()
+    assert not app_module._search_backlog['message']
+    assert app_module._flush_search_backlog()
+
+    assert not db.queries
+    assert app_module.search_index.search('数据库') == (0, [])
+    assert app_module.search_index.search('操作系统') == (0, [])